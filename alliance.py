@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+
+from field import overlap, path_deltas
+from motion_profile import Constraints, profile_time, sample, segment_distances
+from spline import hermite
+from trajectory import INCHES_PER_METER, ActionType, MovementStore
+
+
+class RobotSpec:
+    __slots__ = ('name', 'width', 'length', 'speed', 'rotation_speed', 'start')
+
+    def __init__(self, name: str, width: float, length: float, speed: float, rotation_speed: float,
+                 start: tuple = (0.0, 0.0, 0.0)):
+        self.name = name
+        self.width = width
+        self.length = length
+        self.speed = speed
+        self.rotation_speed = rotation_speed
+        self.start = start
+
+    @classmethod
+    def from_settings(cls, settings: dict, defaults: dict) -> 'RobotSpec':
+        x, y, heading = settings.get('start', (0, 0, 0))
+        return cls(
+            settings.get('name', 'robot'),
+            settings.get('width', defaults['robot_width']) / INCHES_PER_METER,
+            settings.get('length', defaults['robot_length']) / INCHES_PER_METER,
+            settings.get('speed', defaults['robot_speed']),
+            settings.get('turn_speed', defaults['robot_turn_speed']),
+            (x / INCHES_PER_METER, y / INCHES_PER_METER, math.radians(heading))
+        )
+
+
+def robot_specs(settings: dict) -> list:
+    # without a robots list the single robot of older configs is used
+    return [RobotSpec.from_settings(robot, settings) for robot in settings['robots']]
+
+
+class Path:
+    __slots__ = (
+        'starts', 'delta', 'targets', 'curved', 'begins', 'durations', 'linear', 'angular', 'linear_time',
+        'angular_time'
+    )
+
+    def __init__(self, store: MovementStore, start: tuple, end: tuple, constraints: Constraints):
+        if len(store) == 0:
+            self.starts = np.asarray(start, dtype=np.float64).reshape(1, 3)
+            self.delta = np.zeros((1, 3))
+            self.targets = np.zeros((1, 3))
+            self.curved = np.zeros(1, dtype=bool)
+            self.linear = self.angular = self.linear_time = self.angular_time = self.durations = np.zeros(1)
+        else:
+            self.starts, self.delta = path_deltas(store, end)
+            self.targets = np.frombuffer(store.amounts, dtype=np.float64).reshape(len(store), 3).copy()
+            self.curved = np.frombuffer(store.actions, dtype=np.int8) == ActionType.SPLINE.value
+            self.linear, self.angular, sleep = segment_distances(store)
+            self.linear_time = profile_time(
+                self.linear, constraints.max_velocity, constraints.max_acceleration, constraints.max_jerk
+            )
+            self.angular_time = profile_time(
+                self.angular, constraints.max_angular_velocity, constraints.max_angular_acceleration
+            )
+            self.durations = np.maximum(self.linear_time, self.angular_time) + sleep
+        self.begins = np.concatenate(([0.0], np.cumsum(self.durations)[:-1]))
+
+    @property
+    def duration(self) -> float:
+        return float(self.begins[-1] + self.durations[-1])
+
+    def poses(self, times, constraints: Constraints) -> np.ndarray:
+        times = np.clip(np.asarray(times, dtype=np.float64), 0, self.duration)
+        segment = np.clip(np.searchsorted(self.begins, times, side='right') - 1, 0, len(self.begins) - 1)
+        elapsed = times - self.begins[segment]
+        linear, angular = self.linear[segment], self.angular[segment]
+        by_linear = self.linear_time[segment] >= self.angular_time[segment]
+        moved, _ = sample(linear, elapsed, constraints.max_velocity, constraints.max_acceleration)
+        turned, _ = sample(angular, elapsed, constraints.max_angular_velocity, constraints.max_angular_acceleration)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(by_linear, moved / linear, turned / angular)
+        fraction = np.where(np.isfinite(fraction), fraction, (elapsed >= self.durations[segment]).astype(float))
+        poses = self.starts[segment] + self.delta[segment] * fraction[:, None]
+        curved = self.curved[segment]
+        if curved.any():
+            poses[curved] = hermite(self.starts[segment[curved]], self.targets[segment[curved]], fraction[curved])
+        return poses
+
+
+class Timeline:
+    def __init__(self, constraints: Constraints, step: float = 0.05, bucket: int = 10):
+        self.constraints = constraints
+        self.step = step
+        self.bucket = bucket
+        self.robots = []
+
+    def add(self, spec: RobotSpec, store: MovementStore, start: tuple, end: tuple):
+        self.robots.append((spec, Path(store, start, end, self.constraints)))
+
+    @property
+    def duration(self) -> float:
+        return max((path.duration for _, path in self.robots), default=0.0)
+
+    def poses(self, time: float) -> list:
+        return [tuple(path.poses([time], self.constraints)[0].tolist()) for _, path in self.robots]
+
+    def interference(self) -> list:
+        steps = int(math.ceil(self.duration / self.step)) + 1
+        buckets = int(math.ceil(steps / self.bucket))
+        times = np.arange(buckets * self.bucket) * self.step
+        poses = [path.poses(times, self.constraints) for _, path in self.robots]
+
+        # only robots whose swept boxes meet in a time bucket get the exact test
+        boxes = []
+        for (spec, _), pose in zip(self.robots, poses):
+            radius = math.hypot(spec.width, spec.length) / 2
+            xy = pose[:, :2].reshape(buckets, self.bucket, 2)
+            boxes.append((xy.min(axis=1) - radius, xy.max(axis=1) + radius))
+
+        stretches = []
+        for a in range(len(self.robots)):
+            for b in range(a + 1, len(self.robots)):
+                meet = np.all((boxes[a][0] <= boxes[b][1]) & (boxes[b][0] <= boxes[a][1]), axis=1)
+                candidates = (np.flatnonzero(meet)[:, None] * self.bucket + np.arange(self.bucket)).reshape(-1)
+                if len(candidates) == 0:
+                    continue
+                first, second = self.robots[a][0], self.robots[b][0]
+                pa, pb = poses[a][candidates], poses[b][candidates]
+                touching = overlap(
+                    (pa[:, 0], pa[:, 1], pa[:, 2], first.width / 2, first.length / 2),
+                    (pb[:, 0], pb[:, 1], pb[:, 2], second.width / 2, second.length / 2)
+                )
+                hits = candidates[touching]
+                if len(hits) == 0:
+                    continue
+                breaks = np.flatnonzero(np.diff(hits) > 1)
+                for start, end in zip(np.concatenate(([0], breaks + 1)), np.concatenate((breaks, [len(hits) - 1]))):
+                    stretches.append((float(times[hits[start]]), float(times[hits[end]]), first.name, second.name))
+        return sorted(stretches)
@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pyglet
+
+
+def downscale(pixels: np.ndarray, width: int, height: int) -> np.ndarray:
+    # premultiplied, so transparent edges don't darken
+    rows, columns = pixels.shape[:2]
+    if width >= columns or height >= rows:
+        y = np.arange(height) * rows // height
+        x = np.arange(width) * columns // width
+        return pixels[y[:, None], x]
+    y = np.linspace(0, rows, height + 1).astype(np.intp)
+    x = np.linspace(0, columns, width + 1).astype(np.intp)
+    area = (np.diff(y)[:, None] * np.diff(x)[None, :])[..., None]
+    result = np.empty((height, width, 4), dtype=np.uint8)
+
+    # a strip of output rows at a time, a 4096 pixel field would need half a gigabyte of floats at once
+    for first in range(0, height, 64):
+        last = min(first + 64, height)
+        color = pixels[y[first]:y[last]].astype(np.float32)
+        color[..., :3] *= color[..., 3:] / 255
+        summed = np.add.reduceat(np.add.reduceat(color, y[first:last] - y[first], axis=0), x[:-1], axis=1)
+        summed /= area[first:last]
+        alpha = summed[..., 3:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summed[..., :3] = np.where(alpha > 0, summed[..., :3] * 255 / alpha, 0)
+        result[first:last] = np.clip(np.rint(summed), 0, 255)
+    return result
+
+
+class Assets:
+    def __init__(self, source: str, cache: str):
+        self.source = source
+        self.cache = cache
+        self.atlas = pyglet.image.atlas.TextureBin()
+        self.images = {}
+
+    def cache_path(self, name: str, width: int, height: int) -> str:
+        status = os.stat(os.path.join(self.source, name))
+        base = os.path.splitext(name)[0]
+        return os.path.join(self.cache, f"{base}-{width}x{height}-{status.st_mtime_ns:x}-{status.st_size:x}.rgba")
+
+    def image_data(self, name: str, width: int = None, height: int = None) -> pyglet.image.ImageData:
+        path = os.path.join(self.source, name)
+        if width is None or height is None:
+            return pyglet.image.load(path).get_image_data()
+
+        cached = self.cache_path(name, width, height)
+        if os.path.exists(cached):
+            with open(cached, 'rb') as file:
+                return pyglet.image.ImageData(width, height, 'RGBA', file.read())
+
+        image = pyglet.image.load(path).get_image_data()
+        pixels = np.frombuffer(image.get_data('RGBA', image.width * 4), dtype=np.uint8)
+        data = downscale(pixels.reshape(image.height, image.width, 4), width, height).tobytes()
+        os.makedirs(self.cache, exist_ok=True)
+        temporary = cached + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, cached)
+        return pyglet.image.ImageData(width, height, 'RGBA', data)
+
+    def image(self, name: str, width: int = None, height: int = None):
+        key = name, width, height
+        if key not in self.images:
+            data = self.image_data(name, width, height)
+            try:
+                self.images[key] = self.atlas.add(data)
+            except pyglet.image.atlas.AllocatorException:
+                self.images[key] = data.get_texture()
+        return self.images[key]
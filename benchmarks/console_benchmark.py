@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+import pyglet
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import Console
+
+
+def measure(console: Console, frames: int) -> float:
+    start = time.perf_counter()
+    for frame in range(frames):
+        console.replace_last(f"move forwards {frame * 0.0167:.4f}")
+    return (time.perf_counter() - start) / frames
+
+
+if __name__ == '__main__':
+    window = pyglet.window.Window(visible=False)
+    batch = pyglet.graphics.Batch()
+    console = Console(0, 0, 400, 600, 16, batch)
+
+    # grow the routine and time a held key (one merged line per frame) at each size
+    print(f"{'movements':>10} {'us/frame':>10}")
+    for size in (10, 100, 1000, 10000, 50000):
+        while len(console.lines) < size:
+            console.append(f"turn right {len(console.lines)}")
+        print(f"{size:>10} {measure(console, 500) * 1e6:>10.1f}")
+
+    window.close()
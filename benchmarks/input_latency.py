@@ -0,0 +1,65 @@
+import os
+import statistics
+import sys
+import time
+import tkinter
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import Application
+
+ICON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources', 'icon.png')
+
+
+def dialog(write: Connection):
+    # what T and F used to do: a fresh Tk interpreter and icon in a new process
+    root = tkinter.Tk()
+    root.iconphoto(False, tkinter.PhotoImage(file=ICON))
+    entry = tkinter.Entry(root)
+    entry.pack()
+    entry.focus()
+
+    def ready():
+        write.send(time.perf_counter())
+        root.destroy()
+
+    root.after_idle(ready)
+    root.mainloop()
+
+
+def process_dialog() -> float:
+    read, write = Pipe()
+    start = time.perf_counter()
+    process = Process(target=dialog, args=(write,))
+    process.start()
+    ready = read.recv()
+    process.join()
+    return ready - start
+
+
+def overlay(app: Application) -> float:
+    start = time.perf_counter()
+    app.prompt.open(['Position to travel to (x, y, rotation [optional]):'], lambda position: None)
+    app.dirty = True
+    app.last_frame = 0
+    app.redraw()
+    ready = time.perf_counter()
+    app.prompt.hide()
+    return ready - start
+
+
+def report(name: str, samples: list):
+    print(f"{name:>16}: median {statistics.median(samples) * 1e3:8.2f} ms, max {max(samples) * 1e3:8.2f} ms")
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    report('process dialog', [process_dialog() for _ in range(runs)])
+
+    app = Application(1280, 720)
+    # draw straight away, like pyglet.app.run
+    app._enable_event_queue = False
+    report('in-window prompt', [overlay(app) for _ in range(runs)])
+    app.close()
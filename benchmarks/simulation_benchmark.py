@@ -0,0 +1,118 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compaction import compact
+from motion_profile import Constraints, estimate
+from profiler import Profiler
+from simulation import Simulation
+from spline import SplineCache
+from trajectory import INCHES_PER_METER, ActionType, Direction, Trajectory
+
+MOVEMENT_KEYS = ('W', 'A', 'S', 'D', 'Q', 'E')
+
+
+def key_stream(count: int, seed: int):
+    generator = random.Random(seed)
+    for _ in range(count):
+        if generator.random() < 0.05:
+            yield generator.choice(('R', 'SPACE')), False, 1
+        else:
+            yield generator.choice(MOVEMENT_KEYS), generator.random() < 0.2, generator.randint(1, 90)
+
+
+def run(count: int, seed: int, frame_time: float, profiler: Profiler) -> Trajectory:
+    trajectory = Trajectory()
+    simulation = Simulation(trajectory, 1, 45, 120)
+    simulation.step = profiler.wrap(simulation.step, 'simulation.step')
+    update = profiler.wrap(simulation.update, 'frame')
+    simulation.release('ENTER')
+
+    for name, shift, frames in key_stream(count, seed):
+        if shift:
+            simulation.press('LSHIFT')
+        simulation.press(name, shift)
+        for _ in range(frames):
+            update(frame_time)
+        simulation.release(name, shift)
+        if shift:
+            simulation.release('LSHIFT')
+    return trajectory
+
+
+def drag(segments: int, moves: int, seed: int, profiler: Profiler):
+    # one control point in the middle of a spline route, dragged around
+    generator = random.Random(seed)
+    trajectory = Trajectory()
+    trajectory.begin()
+    for index in range(segments):
+        trajectory.move(Direction.VERTICAL, 0.05)
+        trajectory.spline_to(generator.uniform(-1.5, 1.5), generator.uniform(-1.5, 1.5), generator.uniform(-3, 3))
+    cache = SplineCache()
+    cache.update(trajectory.movements)
+
+    def edit(x: float, y: float, tangent: float):
+        trajectory.edit_spline(row, x, y, tangent)
+        cache.update(trajectory.movements)
+
+    edit = profiler.wrap(edit, 'spline.drag')
+    row = int(cache.rows[segments // 2])
+    x, y, tangent = trajectory.movements.amount(row)
+    for _ in range(moves):
+        x, y = x + generator.uniform(-0.01, 0.01), y + generator.uniform(-0.01, 0.01)
+        edit(x, y, tangent)
+
+
+def edit_middle(trajectory: Trajectory, edits: int, seed: int, profiler: Profiler):
+    generator = random.Random(seed)
+    insert = profiler.wrap(trajectory.insert, 'edit.insert')
+    modify = profiler.wrap(trajectory.modify, 'edit.modify')
+    delete = profiler.wrap(trajectory.delete, 'edit.delete')
+    for _ in range(edits):
+        middle = len(trajectory.movements) // 2 + generator.randint(-10, 10)
+        insert(middle, ActionType.MOVEMENT, Direction.VERTICAL, generator.uniform(0.01, 0.1))
+        modify(middle, ActionType.MOVEMENT, Direction.HORIZONTAL, generator.uniform(0.01, 0.1))
+        delete(middle)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drive the headless simulation with synthetic keys and time it.')
+    parser.add_argument('--keys', type=int, default=2000, help='number of synthetic key strokes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fps', type=float, default=60, help='frame rate the updates are fed at')
+    parser.add_argument('--splines', type=int, default=30, help='spline segments in the dragged route')
+    parser.add_argument('--drags', type=int, default=1000, help='mouse moves while dragging a control point')
+    parser.add_argument('--edits', type=int, default=200, help='inserts, modifies and deletes in the middle')
+    parser.add_argument('--csv', help='also write the stats to this CSV file')
+    parser.add_argument('--max-p99', type=float, help='fail when any section has a p99 above this many ms')
+    args = parser.parse_args()
+
+    profiler = Profiler(size=1000000, enabled=True)
+    start = time.perf_counter()
+    trajectory = run(args.keys, args.seed, 1 / args.fps, profiler)
+    constraints = Constraints(30 / INCHES_PER_METER, 30 / INCHES_PER_METER, math.radians(60), math.radians(60))
+    movements = profiler.wrap(compact)(trajectory.movements, trajectory.start, 0.5 / INCHES_PER_METER, math.radians(1))
+    profiler.wrap(trajectory.get_code)(movements)
+    profiler.wrap(estimate)(trajectory.movements, constraints)
+    drag(args.splines, args.drags, args.seed, profiler)
+    edit_middle(trajectory, args.edits, args.seed, profiler)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.keys} key strokes, {len(trajectory.movements)} movements, "
+          f"{len(movements)} after compaction, {elapsed:.3f}s")
+    print(f"{'section':>16} {'calls':>8} {'mean ms':>10} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for name, calls, *times in profiler.summary():
+        print(f"{name:>16} {calls:>8} " + " ".join(f"{value * 1000:>10.4f}" for value in times))
+    if args.csv:
+        profiler.dump_csv(args.csv)
+
+    if args.max_p99 is not None:
+        slow = [name for name, _, _, _, p99, _ in profiler.summary() if p99 * 1000 > args.max_p99]
+        if slow:
+            print(f"p99 over {args.max_p99} ms: {', '.join(slow)}")
+            sys.exit(1)
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+# runs in a fresh interpreter so imports, image decoding and texture uploads are all paid again
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import pyglet
+from main import Application
+imported = time.perf_counter()
+app = Application({width}, {height})
+app._enable_event_queue = False
+created = time.perf_counter()
+app.redraw()
+pyglet.gl.glFinish()
+drawn = time.perf_counter()
+print(json.dumps(dict(imports=imported - start, window=created - imported, first_frame=drawn - created)))
+app.close()
+"""
+
+
+def launch(width: int, height: int) -> dict:
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(root=ROOT, width=width, height=height)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    total = time.perf_counter() - start
+    result = json.loads(output.strip().splitlines()[-1])
+    result['total'] = total
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time from launching the app to its first drawn frame.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--cold', action='store_true', help='empty the image cache before every run')
+    args = parser.parse_args()
+
+    settings, _ = config.load(os.path.join(ROOT, 'config.json'))
+    cache = os.path.join(ROOT, (settings or config.DEFAULTS)['cache_directory'])
+
+    runs = []
+    for _ in range(args.runs):
+        if args.cold:
+            shutil.rmtree(cache, ignore_errors=True)
+        runs.append(launch(args.width, args.height))
+
+    print(f"{'phase':>12} {'median ms':>10} {'max ms':>10}")
+    for phase in ('imports', 'window', 'first_frame', 'total'):
+        times = [run[phase] * 1000 for run in runs]
+        print(f"{phase:>12} {statistics.median(times):>10.1f} {max(times):>10.1f}")
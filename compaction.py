@@ -0,0 +1,104 @@
+import math
+
+from trajectory import ActionType, Direction, Movement, advance
+
+EPSILON = 1e-4
+
+
+def merge_turns(movements: list) -> list:
+    merged = []
+    for movement in movements:
+        if movement.action == ActionType.VOID:
+            continue
+        if movement.action == ActionType.ROTATION and merged and merged[-1].action == ActionType.ROTATION:
+            merged[-1] = merged[-1] + movement
+        else:
+            merged.append(movement)
+    return [
+        movement for movement in merged
+        if movement.action != ActionType.ROTATION or abs(movement.amount) >= EPSILON
+    ]
+
+
+def deviation(pose: tuple, first: tuple, last: tuple, tolerance: float, angular_tolerance: float) -> float:
+    dx, dy = last[0] - first[0], last[1] - first[1]
+    length = math.hypot(dx, dy)
+    px, py = pose[0] - first[0], pose[1] - first[1]
+    if length > 0:
+        t = min(max((px * dx + py * dy) / (length * length), 0), 1)
+        distance = abs(px * dy - py * dx) / length if 0 < t < 1 else math.hypot(px - t * dx, py - t * dy)
+    else:
+        t = 0.5
+        distance = math.hypot(px, py)
+    heading = first[2] + t * (last[2] - first[2])
+    return max(distance / tolerance, abs(pose[2] - heading) / angular_tolerance)
+
+
+def simplify(poses: list, tolerance: float, angular_tolerance: float) -> list:
+    # iterative, so long runs cannot hit the recursion limit
+    keep = [False] * len(poses)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(poses) - 1)]
+    while stack:
+        first, last = stack.pop()
+        worst, index = 1, None
+        for i in range(first + 1, last):
+            error = deviation(poses[i], poses[first], poses[last], tolerance, angular_tolerance)
+            if error > worst:
+                worst, index = error, i
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [i for i, kept in enumerate(keep) if kept]
+
+
+def compact_run(movements: list, start: tuple, tolerance: float, angular_tolerance: float) -> list:
+    poses = [start]
+    for movement in movements:
+        poses.append(advance(poses[-1], movement.action, movement.direction, movement.amount))
+
+    kept = simplify(poses, tolerance, angular_tolerance)
+    compacted = []
+    for first, last in zip(kept, kept[1:]):
+        if last - first == 1:
+            compacted.append(movements[first])
+            continue
+        a, b = poses[first], poses[last]
+        if math.hypot(b[0] - a[0], b[1] - a[1]) < EPSILON:
+            if abs(b[2] - a[2]) >= EPSILON:
+                compacted.append(Movement(ActionType.ROTATION, Direction.VOID, a[2] - b[2], a))
+        elif abs(b[2] - a[2]) < EPSILON:
+            compacted.append(Movement(
+                ActionType.MOVEMENT, Direction.POSITIONAL, (round(b[0], 4), round(b[1], 4)), a
+            ))
+        else:
+            compacted.append(Movement(
+                ActionType.MOVEMENT, Direction.POSITIONAL, (round(b[0], 4), round(b[1], 4), round(b[2], 4)), a
+            ))
+    return compacted
+
+
+def compact(movements, start: tuple, tolerance: float, angular_tolerance: float) -> list:
+    if tolerance <= 0 or angular_tolerance <= 0:
+        return [movement for movement in movements if movement.action != ActionType.VOID]
+    movements = merge_turns(list(movements))
+
+    # sleeps, functions and splines split the path, only the runs between them are compacted
+    compacted = []
+    run = []
+    pose = start
+    run_start = start
+    for movement in movements:
+        if movement.action in (ActionType.SLEEP, ActionType.FUNCTION, ActionType.SPLINE):
+            compacted += compact_run(run, run_start, tolerance, angular_tolerance) if run else []
+            compacted.append(movement)
+            pose = advance(pose, movement.action, movement.direction, movement.amount)
+            run = []
+            run_start = pose
+        else:
+            run.append(movement)
+            pose = advance(pose, movement.action, movement.direction, movement.amount)
+    if run:
+        compacted += compact_run(run, run_start, tolerance, angular_tolerance)
+    return compacted
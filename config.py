@@ -0,0 +1,113 @@
+import json
+import numbers
+
+from templates import TEMPLATES
+
+REQUIRED = ('robot_width', 'robot_length', 'robot_speed', 'robot_turn_speed', 'font_size')
+# keys a config.json from before them can leave out
+DEFAULTS = {
+    'max_fps': 60, 'update_rate': 120, 'compaction_tolerance': 0, 'compaction_angle': 0, 'max_velocity': 30,
+    'max_acceleration': 30, 'max_angular_velocity': 60, 'max_angular_acceleration': 60, 'max_jerk': 0,
+    'max_centripetal_acceleration': 0, 'track_width': 0, 'lateral_multiplier': 1, 'autonomous_time': 30,
+    'history_depth': 1000, 'routine_directory': 'routines', 'cache_directory': 'cache', 'code_template': 'roadrunner',
+    'obstacles': [], 'robots': [{}]
+}
+POSITIVE = REQUIRED + (
+    'update_rate', 'max_velocity', 'max_acceleration', 'max_angular_velocity', 'max_angular_acceleration',
+    'autonomous_time', 'history_depth'
+)
+NOT_NEGATIVE = (
+    'max_fps', 'compaction_tolerance', 'compaction_angle', 'max_jerk', 'max_centripetal_acceleration', 'track_width',
+    'lateral_multiplier'
+)
+TEXT = ('routine_directory', 'cache_directory', 'code_template')
+
+
+def number(value) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def load(path: str) -> tuple:
+    # (settings, errors), settings is None when the file cannot be used at all
+    try:
+        with open(path, 'r') as config:
+            settings = json.load(config)
+    except (OSError, ValueError) as error:
+        return None, [f"{path}: {error}"]
+    if not isinstance(settings, dict):
+        return None, [f"{path}: expected an object"]
+    errors = validate(settings)
+    return (None if errors else dict(DEFAULTS, **settings)), errors
+
+
+def validate(settings: dict) -> list:
+    errors = []
+    for name in REQUIRED:
+        if name not in settings:
+            errors.append(f"{name} is missing")
+    for name in POSITIVE:
+        if name in settings and (not number(settings[name]) or settings[name] <= 0):
+            errors.append(f"{name} must be a number above 0")
+    for name in NOT_NEGATIVE:
+        if name in settings and (not number(settings[name]) or settings[name] < 0):
+            errors.append(f"{name} must be a number, 0 or more")
+    for name in TEXT:
+        if name in settings and not isinstance(settings[name], str):
+            errors.append(f"{name} must be text")
+    if isinstance(settings.get('code_template'), str) and settings['code_template'] not in TEMPLATES:
+        errors.append(f"code_template must be one of {', '.join(sorted(TEMPLATES))}")
+
+    for index, line in enumerate(items(settings, 'lines', errors, required=True)):
+        fields(line, f"lines[{index}]", ('length', 'angle', 'width'), errors)
+        color = line.get('color')
+        if not isinstance(color, list) or len(color) != 3 or \
+                not all(isinstance(value, int) and 0 <= value <= 255 for value in color):
+            errors.append(f"lines[{index}].color must be three numbers from 0 to 255")
+
+    for index, obstacle in enumerate(items(settings, 'obstacles', errors)):
+        fields(obstacle, f"obstacles[{index}]", ('x', 'y', 'width', 'length'), errors, optional=('angle',))
+        if 'name' in obstacle and not isinstance(obstacle['name'], str):
+            errors.append(f"obstacles[{index}].name must be text")
+        for name in ('width', 'length'):
+            if number(obstacle.get(name)) and obstacle[name] <= 0:
+                errors.append(f"obstacles[{index}].{name} must be above 0")
+
+    robots = items(settings, 'robots', errors)
+    if 'robots' in settings and isinstance(settings['robots'], list) and not robots:
+        errors.append("robots must list at least one robot")
+    for index, robot in enumerate(robots):
+        fields(robot, f"robots[{index}]", (), errors, optional=('width', 'length', 'speed', 'turn_speed'))
+        if 'name' in robot and not isinstance(robot['name'], str):
+            errors.append(f"robots[{index}].name must be text")
+        for name in ('width', 'length', 'speed', 'turn_speed'):
+            if number(robot.get(name)) and robot[name] <= 0:
+                errors.append(f"robots[{index}].{name} must be above 0")
+        start = robot.get('start', [0, 0, 0])
+        if not isinstance(start, list) or len(start) != 3 or not all(number(value) for value in start):
+            errors.append(f"robots[{index}].start must be x, y and heading")
+    return errors
+
+
+def items(settings: dict, name: str, errors: list, required: bool = False) -> list:
+    if name not in settings:
+        if required:
+            errors.append(f"{name} is missing")
+        return []
+    value = settings[name]
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+        errors.append(f"{name} must be a list of objects")
+        return []
+    return value
+
+
+def fields(item: dict, where: str, names: tuple, errors: list, optional: tuple = ()):
+    for name in names:
+        if not number(item.get(name)):
+            errors.append(f"{where}.{name} must be a number")
+    for name in optional:
+        if name in item and not number(item[name]):
+            errors.append(f"{where}.{name} must be a number")
+
+
+def changes(old: dict, new: dict) -> set:
+    return {name for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
@@ -0,0 +1,114 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import config
+from storage import Library, Routine
+from templates import TEMPLATES, generate_code
+
+CACHE = '.export-cache.json'
+
+
+def fingerprint(path: str, template: str, tolerance: float, angle: float) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    digest.update(f"{template}:{TEMPLATES[template].version}:{float(tolerance)!r}:{float(angle)!r}".encode())
+    return digest.hexdigest()
+
+
+def generate(path: str, output: str, template: str, tolerance: float, angle: float) -> str:
+    routine = Routine(path)
+    start, movements = routine.load()
+    routine.close()
+    temporary = output + '.tmp'
+    with open(temporary, 'w') as file:
+        file.write(generate_code(start, movements, template, tolerance, angle) + '\n')
+    os.replace(temporary, output)
+    return output
+
+
+def export(directory: str, output: str, templates: list, tolerance: float, angle: float, jobs: int = None,
+           force: bool = False) -> tuple:
+    library = Library(directory)
+    os.makedirs(output, exist_ok=True)
+    cache_path = os.path.join(output, CACHE)
+    try:
+        with open(cache_path, 'r') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        cache = {}
+
+    routines = list(library)
+    stems = Counter(routine.name for routine in routines)
+    work, skipped = [], []
+    for routine in routines:
+        # a.json and a.traj would otherwise write the same file
+        name = os.path.basename(routine.path) if stems[routine.name] > 1 else routine.name
+        for template in templates:
+            target = os.path.join(output, name + TEMPLATES[template].extension)
+            if len(templates) > 1:
+                target = os.path.join(output, template, name + TEMPLATES[template].extension)
+            key = f"{template}/{os.path.basename(routine.path)}"
+            digest = fingerprint(routine.path, template, tolerance, angle)
+            if not force and cache.get(key) == digest and os.path.exists(target):
+                skipped.append(target)
+            else:
+                work.append((key, digest, routine.path, target, template))
+
+    written = []
+    if work:
+        for _, _, _, target, _ in work:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(generate, path, target, template, tolerance, angle): (key, digest)
+                for key, digest, path, target, template in work
+            }
+            for future in as_completed(futures):
+                key, digest = futures[future]
+                try:
+                    written.append(future.result())
+                except (OSError, ValueError, KeyError, struct.error) as error:
+                    print(f"Could not export {key}: {error}", file=sys.stderr)
+                    continue
+                cache[key] = digest
+                print(f"Wrote {written[-1]}")
+
+        with open(cache_path + '.tmp', 'w') as file:
+            json.dump(cache, file, indent=2)
+        os.replace(cache_path + '.tmp', cache_path)
+    return written, skipped
+
+
+if __name__ == '__main__':
+    settings, _ = config.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json'))
+    settings = settings or config.DEFAULTS
+    parser = argparse.ArgumentParser(description='Generate code for every saved routine, without a window.')
+    parser.add_argument('routines', nargs='?', default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), settings['routine_directory']
+    ), help='directory of saved routines (.traj or .json)')
+    parser.add_argument('--output', default='generated', help='directory the code is written to')
+    parser.add_argument('--template', action='append', choices=sorted(TEMPLATES),
+                        help='code template, repeat for several (default: roadrunner)')
+    parser.add_argument('--jobs', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='regenerate routines that have not changed')
+    parser.add_argument('--tolerance', type=float, default=settings['compaction_tolerance'],
+                        help='compaction tolerance in inches, 0 keeps every movement')
+    parser.add_argument('--angle', type=float, default=settings['compaction_angle'],
+                        help='compaction angle in degrees')
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    written, skipped = export(
+        args.routines, args.output, args.template or [settings['code_template']],
+        args.tolerance, args.angle, args.jobs, args.force
+    )
+    print(f"{len(written)} written, {len(skipped)} unchanged in {time.perf_counter() - began:.2f}s")
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+
+from motion_profile import Constraints, normalize_angle, peak_velocity
+from spline import sample
+from trajectory import ActionType, Direction, MovementStore
+
+LIMITS = ('wheel velocity', 'angular velocity', 'angular acceleration', 'centripetal acceleration')
+STEPS = 9
+
+
+def check(store: MovementStore, constraints: Constraints, rows: slice = slice(None)) -> np.ndarray:
+    # demand over limit, above 1 the drivetrain cannot follow the movement
+    count = len(range(len(store))[rows])
+    ratios = np.zeros((count, len(LIMITS)))
+    if count == 0:
+        return ratios
+    actions = np.frombuffer(store.actions, dtype=np.int8)[rows]
+    directions = np.frombuffer(store.directions, dtype=np.int8)[rows]
+    amounts = np.frombuffer(store.amounts, dtype=np.float64).reshape(len(store), 3)[rows]
+    poses = np.frombuffer(store.poses, dtype=np.float64).reshape(len(store), 3)[rows]
+    velocity, acceleration = constraints.max_velocity, constraints.max_acceleration
+
+    movement = actions == ActionType.MOVEMENT.value
+    positional = movement & (directions == Direction.POSITIONAL.value)
+    dx = np.where(positional, amounts[:, 0] - poses[:, 0], 0.0)
+    dy = np.where(positional, amounts[:, 1] - poses[:, 1], 0.0)
+    distance = np.where(movement & ~positional, np.abs(amounts[:, 0]), np.hypot(dx, dy))
+    turn = np.where(positional & ~np.isnan(amounts[:, 2]), normalize_angle(amounts[:, 2] - poses[:, 2]), 0.0)
+
+    peak = peak_velocity(distance, velocity, acceleration, constraints.max_jerk)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(distance > 0, np.abs(turn) / distance, np.where(turn != 0, np.inf, 0.0))
+        angular = np.where(np.isinf(rate), np.inf, peak * rate)
+        angular_acceleration = np.where(np.isinf(rate), np.inf, acceleration * rate)
+
+    rotation = actions == ActionType.ROTATION.value
+    angular = np.where(rotation, peak_velocity(
+        np.abs(amounts[:, 0]), constraints.max_angular_velocity, constraints.max_angular_acceleration
+    ), angular)
+
+    if constraints.track_width > 0:
+        # mecanum wheel speed: forward plus scaled sideways plus turning
+        direction = np.where(
+            positional, np.arctan2(dy, dx) - poses[:, 2],
+            np.where(directions == Direction.HORIZONTAL.value, math.pi / 2, 0.0)
+        )
+        travel = direction[:, None] - turn[:, None] * np.linspace(0, 1, STEPS)
+        wheel = peak[:, None] * (np.abs(np.cos(travel)) + constraints.lateral_multiplier * np.abs(np.sin(travel)))
+        with np.errstate(invalid='ignore'):
+            ratios[:, 0] = (wheel.max(axis=1) + constraints.track_width * angular) / velocity
+    ratios[:, 1] = angular / constraints.max_angular_velocity
+    ratios[:, 2] = angular_acceleration / constraints.max_angular_acceleration
+
+    spline = np.flatnonzero(actions == ActionType.SPLINE.value)
+    if len(spline):
+        points = sample(poses[spline], amounts[spline])
+        step = np.diff(points, axis=1)
+        length = np.hypot(step[..., 0], step[..., 1])
+        travelled = np.cumsum(length, axis=1) - length / 2
+        total = length.sum(axis=1, keepdims=True)
+        cruise = peak_velocity(total, velocity, acceleration)
+        speed = np.minimum(cruise, np.sqrt(2 * acceleration * np.minimum(travelled, total - travelled)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            curvature = np.where(length > 0, np.abs(normalize_angle(step[..., 2])) / length, 0.0)
+        ramping = np.where(speed < cruise, acceleration, 0.0)
+        ratios[spline, 0] = (speed + constraints.track_width * speed * curvature).max(axis=1) / velocity \
+            if constraints.track_width > 0 else 0.0
+        ratios[spline, 1] = (speed * curvature).max(axis=1) / constraints.max_angular_velocity
+        ratios[spline, 2] = (ramping * curvature).max(axis=1) / constraints.max_angular_acceleration
+        ratios[spline, 3] = (speed * speed * curvature).max(axis=1) / constraints.max_centripetal_acceleration
+    return ratios
+
+
+def violations(store: MovementStore, constraints: Constraints, tolerance: float = 1e-3,
+               rows: slice = slice(None)) -> dict:
+    first = range(len(store))[rows].start
+    found, limits = np.nonzero(check(store, constraints, rows) > 1 + tolerance)
+    broken = {}
+    for row, limit in zip(found.tolist(), limits.tolist()):
+        broken.setdefault(first + row, []).append(LIMITS[limit])
+    return broken
@@ -0,0 +1,173 @@
+import math
+
+import numpy as np
+
+from spline import hermite, measure
+from trajectory import INCHES_PER_METER, ActionType, MovementStore
+
+WALL = 'wall'
+
+
+def path_deltas(store: MovementStore, end: tuple) -> tuple:
+    count = len(store)
+    starts = np.frombuffer(store.poses, dtype=np.float64).reshape(count, 3).copy()
+    ends = np.vstack((starts[1:], np.asarray(end, dtype=np.float64).reshape(1, 3)))
+    delta = ends - starts
+
+    # a heading a whole turn away is still reached the short way
+    actions = np.frombuffer(store.actions, dtype=np.int8)
+    positional = (actions == ActionType.MOVEMENT.value) | (actions == ActionType.SPLINE.value)
+    delta[:, 2] = np.where(positional, (delta[:, 2] + math.pi) % (2 * math.pi) - math.pi, delta[:, 2])
+    return starts, delta
+
+
+class Obstacle:
+    __slots__ = ('name', 'x', 'y', 'width', 'length', 'angle')
+
+    def __init__(self, name: str, x: float, y: float, width: float, length: float, angle: float = 0.0):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.length = length
+        self.angle = angle
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        return cls(
+            settings.get('name', 'obstacle'),
+            settings['x'] / INCHES_PER_METER, settings['y'] / INCHES_PER_METER,
+            settings['width'] / INCHES_PER_METER, settings['length'] / INCHES_PER_METER,
+            math.radians(settings.get('angle', 0))
+        )
+
+    @property
+    def radius(self) -> float:
+        return math.hypot(self.width, self.length) / 2
+
+
+def overlap(a: tuple, b: tuple) -> np.ndarray:
+    ax, ay, a_angle, a_width, a_length = a
+    bx, by, b_angle, b_width, b_length = b
+    dx, dy = bx - ax, by - ay
+    separated = np.zeros(np.broadcast(dx, b_angle, a_angle).shape, dtype=bool)
+    for angle in (a_angle, a_angle + math.pi / 2, b_angle, b_angle + math.pi / 2):
+        ux, uy = np.cos(angle), np.sin(angle)
+        reach = a_length * np.abs(np.cos(a_angle) * ux + np.sin(a_angle) * uy) + \
+            a_width * np.abs(-np.sin(a_angle) * ux + np.cos(a_angle) * uy) + \
+            b_length * np.abs(np.cos(b_angle) * ux + np.sin(b_angle) * uy) + \
+            b_width * np.abs(-np.sin(b_angle) * ux + np.cos(b_angle) * uy)
+        separated |= np.abs(dx * ux + dy * uy) >= reach
+    return ~separated
+
+
+class Field:
+    def __init__(self, size: float, robot_width: float, robot_length: float, obstacles: list = (),
+                 cell_size: float = 0.3):
+        self.half = size / 2
+        self.robot_width = robot_width
+        self.robot_length = robot_length
+        self.robot_radius = math.hypot(robot_width, robot_length) / 2
+        self.obstacles = list(obstacles)
+        self.cell_size = cell_size
+
+        self.columns = np.array(
+            [(o.x, o.y, o.angle, o.width / 2, o.length / 2) for o in self.obstacles], dtype=np.float64
+        ).reshape(-1, 5).T
+        self.boxes = [
+            (o.x, o.y, math.cos(o.angle), math.sin(o.angle), o.width / 2, o.length / 2, o.radius)
+            for o in self.obstacles
+        ]
+
+        # each obstacle is in every cell it could touch the robot from
+        self.cells = {}
+        for index, obstacle in enumerate(self.obstacles):
+            reach = obstacle.radius + self.robot_radius
+            for i in range(self.cell(obstacle.x - reach), self.cell(obstacle.x + reach) + 1):
+                for j in range(self.cell(obstacle.y - reach), self.cell(obstacle.y + reach) + 1):
+                    self.cells.setdefault((i, j), []).append(index)
+
+    def cell(self, value: float) -> int:
+        return math.floor(value / self.cell_size)
+
+    def collisions(self, pose: tuple) -> list:
+        x, y, heading = pose
+        hits = []
+        extent_x = abs(math.cos(heading)) * self.robot_length / 2 + abs(math.sin(heading)) * self.robot_width / 2
+        extent_y = abs(math.sin(heading)) * self.robot_length / 2 + abs(math.cos(heading)) * self.robot_width / 2
+        if abs(x) + extent_x > self.half or abs(y) + extent_y > self.half:
+            hits.append(WALL)
+
+        candidates = self.cells.get((self.cell(x), self.cell(y)))
+        if candidates:
+            cos, sin = math.cos(heading), math.sin(heading)
+            width, length = self.robot_width / 2, self.robot_length / 2
+            for index in candidates:
+                ox, oy, o_cos, o_sin, o_width, o_length, radius = self.boxes[index]
+                dx, dy = ox - x, oy - y
+                if math.hypot(dx, dy) >= radius + self.robot_radius:
+                    continue
+                dot, cross = abs(cos * o_cos + sin * o_sin), abs(sin * o_cos - cos * o_sin)
+                if abs(dx * cos + dy * sin) >= length + o_length * dot + o_width * cross or \
+                        abs(dy * cos - dx * sin) >= width + o_length * cross + o_width * dot or \
+                        abs(dx * o_cos + dy * o_sin) >= o_length + length * dot + width * cross or \
+                        abs(dy * o_cos - dx * o_sin) >= o_width + length * cross + width * dot:
+                    continue
+                hits.append(self.obstacles[index].name)
+        return hits
+
+    def sample_path(self, store: MovementStore, end: tuple, spacing: float) -> tuple:
+        count = len(store)
+        if count == 0:
+            return np.zeros(0, dtype=np.intp), np.zeros((0, 3))
+        starts, delta = path_deltas(store, end)
+        travel = np.maximum(np.hypot(delta[:, 0], delta[:, 1]), np.abs(delta[:, 2]) * self.robot_radius)
+        spline = np.frombuffer(store.actions, dtype=np.int8) == ActionType.SPLINE.value
+        targets = np.frombuffer(store.amounts, dtype=np.float64).reshape(count, 3)
+        if spline.any():
+            length, turning = measure(starts[spline], targets[spline])
+            travel[spline] = np.maximum(length, turning * self.robot_radius)
+        steps = np.ceil(travel / spacing).astype(np.intp) + 1
+        movement = np.repeat(np.arange(count), steps)
+        offsets = np.arange(len(movement)) - np.repeat(np.cumsum(steps) - steps, steps)
+        fraction = offsets / np.maximum(steps - 1, 1)[movement]
+        poses = starts[movement] + delta[movement] * fraction[:, None]
+        curved = spline[movement]
+        if curved.any():
+            poses[curved] = hermite(starts[movement[curved]], targets[movement[curved]], fraction[curved])
+        return movement, poses
+
+    def check_path(self, store: MovementStore, end: tuple, spacing: float = None) -> list:
+        spacing = spacing or min(self.robot_width, self.robot_length) / 4
+        movement, poses = self.sample_path(store, end, spacing)
+        if len(poses) == 0:
+            return []
+        x, y, heading = poses.T
+        hits = set()
+
+        extent_x = np.abs(np.cos(heading)) * self.robot_length / 2 + np.abs(np.sin(heading)) * self.robot_width / 2
+        extent_y = np.abs(np.sin(heading)) * self.robot_length / 2 + np.abs(np.cos(heading)) * self.robot_width / 2
+        walls = (np.abs(x) + extent_x > self.half) | (np.abs(y) + extent_y > self.half)
+        hits.update((int(index), WALL) for index in np.unique(movement[walls]))
+
+        if self.obstacles:
+            cells = np.floor(poses[:, :2] / self.cell_size).astype(np.int64)
+            unique, inverse = np.unique(cells, axis=0, return_inverse=True)
+            order = np.argsort(inverse.reshape(-1), kind='stable')
+            groups = np.split(order, np.cumsum(np.bincount(inverse.reshape(-1), minlength=len(unique)))[:-1])
+            samples, candidates = [], []
+            for (i, j), members in zip(unique.tolist(), groups):
+                indices = self.cells.get((i, j))
+                if indices:
+                    samples.append(np.repeat(members, len(indices)))
+                    candidates.append(np.tile(indices, len(members)))
+            if samples:
+                samples, candidates = np.concatenate(samples), np.concatenate(candidates)
+                robot = (x[samples], y[samples], heading[samples], self.robot_width / 2, self.robot_length / 2)
+                touching = overlap(robot, tuple(self.columns[:, candidates]))
+                hits.update(
+                    (int(index), self.obstacles[obstacle].name)
+                    for index, obstacle in set(zip(movement[samples[touching]], candidates[touching]))
+                )
+        return sorted(hits)
+
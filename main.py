@@ -1,538 +1,1573 @@
-import json
+import argparse
+import functools
 import math
 import os
-import tkinter
-import tkinter.messagebox
-from enum import Enum
-from multiprocessing import Process, Pipe
-from multiprocessing.connection import Connection
+import struct
+import time
 
+import numpy as np
 import pyglet
-import pyperclip
 from pyglet.window import key
 
+import config
+from alliance import RobotSpec, Timeline, robot_specs
+from assets import Assets
+from feasibility import violations
+from field import Field, Obstacle
+from motion_profile import Constraints, estimate
+from profiler import Profiler
+from simulation import Recorder, Simulation
+from snapping import SnapIndex, tidy
+from spline import SAMPLES, SplineCache
+from storage import Library
+from telemetry import decimate, deviation, load_log
+from templates import generate_code
+from trajectory import INCHES_PER_METER, ActionType, Change, Direction, Trajectory, advance, parse
+
+
+class Console:
+    def __init__(self, x: float, y: float, width: float, height: float, font_size: int, batch: pyglet.graphics.Batch,
+                 group: pyglet.graphics.Group = None):
+        self.lines = []
+        self.times = []
+        self.flags = {}
+        self.selected = None
+        self.first = 0
+        self.follow = True
+        self.scrolled = 0.0
+        self.style = dict(color=(255, 255, 255, 255), font_size=font_size)
+
+        # only the rows that fit in the viewport are ever put in the document
+        font = pyglet.font.load(None, font_size)
+        self.row_height = font.ascent - font.descent
+        self.rows = max(1, int(height // self.row_height))
+        self.document = pyglet.text.document.FormattedDocument()
+        self.layout = pyglet.text.layout.IncrementalTextLayout(
+            self.document,
+            width, height,
+            multiline=True,
+            batch=batch,
+            group=group
+        )
+        self.layout.x, self.layout.y = x, y
+
+    def format(self, index: int) -> str:
+        flag = self.flags.get(index)
+        marker = "> " if index == self.selected else ""
+        seconds = self.times[index]
+        return f"{marker}{index + 1}: {self.lines[index]}" + (f"  {seconds:.2f}s" if seconds is not None else "") + \
+            (f"  (over {flag})" if flag else "") + "\n"
+
+    def visible(self, index: int) -> bool:
+        return self.first <= index < self.first + self.rows
+
+    def append(self, line: str):
+        self.lines.append(line)
+        self.times.append(None)
+        index = len(self.lines) - 1
+        if self.visible(index):
+            self.document.insert_text(len(self.document.text), self.format(index), self.style)
+        elif self.follow and index == self.first + self.rows:
+            self.layout.begin_update()
+            self.document.delete_text(0, len(self.format(self.first)))
+            self.first += 1
+            self.document.insert_text(len(self.document.text), self.format(index), self.style)
+            self.layout.end_update()
+
+    def replace_last(self, line: str):
+        index = len(self.lines) - 1
+        if self.visible(index):
+            end = len(self.document.text)
+            start = end - len(self.format(index))
+            self.lines[index] = line
+            self.layout.begin_update()
+            self.document.delete_text(start, end)
+            self.document.insert_text(start, self.format(index), self.style)
+            self.layout.end_update()
+        else:
+            self.lines[index] = line
+
+    def span(self, index: int) -> tuple:
+        if index == len(self.lines) - 1:
+            end = len(self.document.text)
+            return end - len(self.format(index)), end
+        start = sum(len(self.format(row)) for row in range(self.first, index))
+        return start, start + len(self.format(index))
+
+    def replace(self, index: int, line: str, flag: str = None):
+        # a flag of None keeps the row's flag, an empty one clears it
+        visible = self.visible(index)
+        if visible:
+            start, end = self.span(index)
+        self.lines[index] = line
+        if flag:
+            self.flags[index] = flag
+        elif flag is not None:
+            self.flags.pop(index, None)
+        if visible:
+            self.layout.begin_update()
+            self.document.delete_text(start, end)
+            self.document.insert_text(start, self.format(index), self.style)
+            self.layout.end_update()
+
+    def time(self, index: int, seconds: float):
+        if self.times[index] == seconds:
+            return
+        if not self.visible(index):
+            self.times[index] = seconds
+            return
+        start, end = self.span(index)
+        self.times[index] = seconds
+        self.layout.begin_update()
+        self.document.delete_text(start, end)
+        self.document.insert_text(start, self.format(index), self.style)
+        self.layout.end_update()
+
+    def retime(self, times: list):
+        self.times = times
+        self.refresh()
+
+    def flag(self, flags: dict, first: int = 0):
+        # in row order, so the rows before a rewritten one match the document
+        for row in range(first, len(self.lines)):
+            if self.flags.get(row) != flags.get(row):
+                self.replace(row, self.lines[row], flags.get(row, ''))
+
+    def pop(self):
+        index = len(self.lines) - 1
+        if self.visible(index):
+            end = len(self.document.text)
+            self.document.delete_text(end - len(self.format(index)), end)
+        self.lines.pop(-1)
+        self.times.pop(-1)
+        self.flags.pop(index, None)
+        if self.selected == index:
+            self.selected = None
+        if self.first > 0 and self.first + self.rows > len(self.lines):
+            self.first -= 1
+            self.document.insert_text(0, self.format(self.first), self.style)
+
+    def insert(self, index: int, line: str):
+        self.lines.insert(index, line)
+        self.times.insert(index, None)
+        self.flags = {row + (row >= index): flag for row, flag in self.flags.items()}
+        if self.selected is not None and self.selected >= index:
+            self.selected += 1
+        first = max(len(self.lines) - self.rows, 0) if self.follow else self.first
+        if first != self.first or index < self.first + self.rows:
+            self.first = first
+            self.refresh()
+
+    def delete(self, index: int):
+        self.lines.pop(index)
+        self.times.pop(index)
+        self.flags = {row - (row > index): flag for row, flag in self.flags.items() if row != index}
+        if self.selected is not None and (self.selected > index or self.selected == len(self.lines)):
+            self.selected = self.selected - 1 if self.selected > 0 else None
+        first = min(self.first, max(len(self.lines) - self.rows, 0))
+        if first != self.first or index < self.first + self.rows:
+            self.first = first
+            self.refresh()
+
+    def select(self, index: int = None):
+        if index is not None:
+            index = min(max(index, 0), len(self.lines) - 1) if self.lines else None
+        if index == self.selected:
+            return
+        self.selected = index
+        if index is not None and not self.visible(index):
+            self.first = index if index < self.first else index - self.rows + 1
+            self.follow = self.first + self.rows >= len(self.lines)
+        self.refresh()
+
+    def row_at(self, y: float) -> int:
+        row = self.first + int((self.layout.y + self.layout.height - y) // self.row_height)
+        return row if self.visible(row) and row < len(self.lines) else None
+
+    def clear(self):
+        self.lines.clear()
+        self.times.clear()
+        self.flags.clear()
+        self.selected = None
+        self.first = 0
+        self.follow = True
+        self.document.delete_text(0, len(self.document.text))
+
+    def scroll(self, rows: float):
+        # touchpads scroll by fractions of a row
+        self.scrolled = round(self.scrolled + rows, 6)
+        whole = int(self.scrolled)
+        self.scrolled -= whole
+        first = min(max(self.first + whole, 0), max(len(self.lines) - self.rows, 0))
+        if first != self.first:
+            self.first = first
+            self.follow = self.first + self.rows >= len(self.lines)
+            self.refresh()
+
+    def refresh(self):
+        text = "".join(self.format(index) for index in range(self.first, min(self.first + self.rows, len(self.lines))))
+        self.layout.begin_update()
+        self.document.delete_text(0, len(self.document.text))
+        if text:
+            self.document.insert_text(0, text, self.style)
+        self.layout.end_update()
+
+    def contains(self, x: float, y: float) -> bool:
+        return self.layout.x <= x <= self.layout.x + self.layout.width and \
+            self.layout.y <= y <= self.layout.y + self.layout.height
+
+
+class Trail:
+    VERTICES = 4
+    COLORS = {
+        ActionType.MOVEMENT: (0, 220, 0, 220),
+        ActionType.SLEEP: (80, 140, 255, 255),
+        ActionType.FUNCTION: (255, 220, 0, 255)
+    }
+    POSITIONAL_COLOR = (0, 200, 255, 220)
+    FLAGGED_COLOR = (255, 60, 60, 255)
+
+    def __init__(self, center_x: float, center_y: float, pixel_per_meter: float, batch: pyglet.graphics.Batch,
+                 group: pyglet.graphics.Group = None, capacity: int = 256, marker_size: float = 6):
+        self.center_x = center_x
+        self.center_y = center_y
+        self.pixel_per_meter = pixel_per_meter
+        self.marker_size = marker_size
+        self.initial_capacity = capacity
+        self.capacity = capacity
+        self.size = 0
+        self.flagged = set()
+
+        # one vertex list, so one draw call however long the routine gets
+        self.vertex_list = batch.add(
+            capacity * self.VERTICES, pyglet.gl.GL_LINES, group, 'v2f/dynamic', 'c4B/dynamic'
+        )
+        self.erase(0, capacity)
+
+    def upload(self, name: str, row: int, values: list):
+        attribute = self.vertex_list.domain.attribute_names[name]
+        region = attribute.get_region(
+            attribute.buffer, self.vertex_list.start + row * self.VERTICES, len(values) // attribute.count
+        )
+        region.array[:] = values
+        region.invalidate()
+
+    def write(self, row: int, vertices: list, colors: list):
+        self.upload('vertices', row, vertices)
+        self.upload('colors', row, colors)
+
+    def erase(self, row: int, count: int):
+        self.write(row, [0.0] * (count * self.VERTICES * 2), [0] * (count * self.VERTICES * 4))
+
+    def resize(self, capacity: int):
+        self.vertex_list.resize(capacity * self.VERTICES)
+        if capacity > self.capacity:
+            self.erase(self.capacity, capacity - self.capacity)
+        self.capacity = capacity
+
+    def row(self, movement) -> tuple:
+        x, y, _ = movement.state
+        x, y = self.center_x + x * self.pixel_per_meter, self.center_y + y * self.pixel_per_meter
+        if movement.action in (ActionType.SLEEP, ActionType.FUNCTION):
+            size = self.marker_size
+            vertices = [x - size, y - size, x + size, y + size, x - size, y + size, x + size, y - size]
+            return vertices, list(self.COLORS[movement.action]) * self.VERTICES
+
+        if movement.action != ActionType.MOVEMENT:
+            return [0.0] * (self.VERTICES * 2), [0] * (self.VERTICES * 4)
+        end_x, end_y, _ = advance(movement.state, movement.action, movement.direction, movement.amount)
+        end_x, end_y = self.center_x + end_x * self.pixel_per_meter, self.center_y + end_y * self.pixel_per_meter
+        color = self.POSITIONAL_COLOR if movement.direction == Direction.POSITIONAL else self.COLORS[movement.action]
+        return [x, y, end_x, end_y, 0.0, 0.0, 0.0, 0.0], list(color) * 2 + [0] * 8
+
+    def tint(self, row: int, colors: list) -> list:
+        if row in self.flagged:
+            return list(self.FLAGGED_COLOR) * 2 + colors[8:]
+        return colors
+
+    def flag(self, rows: set, movement, first: int = 0):
+        for row in range(first, self.size):
+            if (row in rows) != (row in self.flagged):
+                if row in rows:
+                    self.flagged.add(row)
+                else:
+                    self.flagged.discard(row)
+                self.upload('colors', row, self.tint(row, self.row(movement(row))[1]))
+
+    def append(self, movement):
+        if self.size == self.capacity:
+            self.resize(self.capacity * 2)
+        vertices, colors = self.row(movement)
+        self.write(self.size, vertices, self.tint(self.size, colors))
+        self.size += 1
+
+    def replace_last(self, movement):
+        vertices, colors = self.row(movement)
+        self.write(self.size - 1, vertices, self.tint(self.size - 1, colors))
+
+    def rewrite(self, first: int, movements):
+        vertices, colors = [], []
+        for row, movement in enumerate(movements, first):
+            row_vertices, row_colors = self.row(movement)
+            vertices += row_vertices
+            colors += self.tint(row, row_colors)
+        if vertices:
+            self.write(first, vertices, colors)
+
+    def insert(self, row: int, movements):
+        if self.size == self.capacity:
+            self.resize(self.capacity * 2)
+        self.size += 1
+        self.flagged = {flagged + (flagged >= row) for flagged in self.flagged}
+        self.rewrite(row, movements)
+
+    def delete(self, row: int, movements):
+        self.flagged = {flagged - (flagged > row) for flagged in self.flagged if flagged != row}
+        self.rewrite(row, movements)
+        self.pop()
+
+    def pop(self):
+        self.size -= 1
+        self.flagged.discard(self.size)
+        self.erase(self.size, 1)
+        if self.capacity > self.initial_capacity and self.size < self.capacity // 4:
+            self.resize(self.capacity // 2)
+
+    def clear(self):
+        self.erase(0, self.size)
+        self.size = 0
+        self.flagged = set()
+        if self.capacity != self.initial_capacity:
+            self.resize(self.initial_capacity)
+
+
+class Curves(Trail):
+    VERTICES = SAMPLES * 2 + 2
+    COLOR = (255, 140, 0, 230)
+    HANDLE_COLOR = (255, 255, 255, 160)
+
+    def __init__(self, center_x: float, center_y: float, pixel_per_meter: float, batch: pyglet.graphics.Batch,
+                 group: pyglet.graphics.Group = None, capacity: int = 16, handle_length: float = 0.2):
+        super(Curves, self).__init__(center_x, center_y, pixel_per_meter, batch, group, capacity)
+        self.cache = SplineCache()
+        self.handle_length = handle_length
+        self.colors = list(self.COLOR) * (SAMPLES * 2) + list(self.HANDLE_COLOR) * 2
+
+    def tint(self, row: int, colors: list) -> list:
+        # flagged by movement index, since splines move between slots as the routine changes
+        if row < len(self.cache) and int(self.cache.rows[row]) in self.flagged:
+            return list(self.FLAGGED_COLOR) * (SAMPLES * 2) + colors[-8:]
+        return colors
+
+    def flag(self, rows: set, movement=None, first: int = 0):
+        previous = self.flagged
+        self.flagged = {index for index in previous if index < first}
+        for slot in np.flatnonzero(self.cache.rows >= first).tolist():
+            index = int(self.cache.rows[slot])
+            if index in rows:
+                self.flagged.add(index)
+            if (index in rows) != (index in previous):
+                self.upload('colors', slot, self.tint(slot, self.colors))
+
+    def handles(self) -> tuple:
+        targets = self.cache.targets()
+        points = targets[:, :2] * self.pixel_per_meter + (self.center_x, self.center_y)
+        direction = np.column_stack((np.cos(targets[:, 2]), np.sin(targets[:, 2])))
+        return points, points + direction * self.handle_length * self.pixel_per_meter
+
+    def grab(self, x: float, y: float, radius: float) -> tuple:
+        if len(self.cache) == 0:
+            return None
+        for kind, positions in zip(('point', 'tangent'), self.handles()):
+            distance = np.hypot(positions[:, 0] - x, positions[:, 1] - y)
+            nearest = int(np.argmin(distance))
+            if distance[nearest] <= radius:
+                return int(self.cache.rows[nearest]), kind
+        return None
+
+    def sync(self, movements):
+        stale = self.cache.update(movements)
+        count = len(self.cache)
+        if count < self.size:
+            self.erase(count, self.size - count)
+        capacity = self.capacity
+        while count > capacity:
+            capacity *= 2
+        while capacity > self.initial_capacity and count < capacity // 4:
+            capacity //= 2
+        if capacity != self.capacity:
+            self.resize(capacity)
+        self.size = count
+        if len(stale) == 0:
+            return
+
+        points = self.cache.points[stale, :, :2] * self.pixel_per_meter + (self.center_x, self.center_y)
+        segments = np.stack((points[:, :-1], points[:, 1:]), axis=2).reshape(len(stale), -1)
+        _, tips = self.handles()
+        vertices = np.hstack((segments, points[:, -1], tips[stale]))
+        for index, row in zip(stale.tolist(), vertices.tolist()):
+            self.write(index, row, self.tint(index, self.colors))
+
+
+class LogPath:
+    COLOR = (255, 0, 255, 200)
+
+    def __init__(self, center_x: float, center_y: float, pixel_per_meter: float, batch: pyglet.graphics.Batch,
+                 group: pyglet.graphics.Group = None):
+        self.center_x = center_x
+        self.center_y = center_y
+        self.pixel_per_meter = pixel_per_meter
+        self.batch = batch
+        self.group = group
+        self.vertex_list = None
+
+    def show(self, poses: np.ndarray):
+        self.clear()
+        if len(poses) < 2:
+            return
+        pixels = poses[:, :2] * self.pixel_per_meter + (self.center_x, self.center_y)
+        vertices = np.repeat(pixels, 2, axis=0)[1:-1].reshape(-1)
+        count = len(vertices) // 2
+        self.vertex_list = self.batch.add(
+            count, pyglet.gl.GL_LINES, self.group, ('v2f/static', vertices.tolist()), ('c4B/static', self.COLOR * count)
+        )
 
-class ActionType(Enum):
-    VOID = -1
-    ROTATION = 0
-    MOVEMENT = 1
-    SLEEP = 2
-    FUNCTION = 3
-
-
-class Direction(Enum):
-    VOID = -1
-    HORIZONTAL = 0
-    VERTICAL = 1
-    POSITIONAL = 10
-
-
-class FunctionDialog(tkinter.Tk):
-    def __init__(self, write: Connection):
-        super(FunctionDialog, self).__init__()
-        self.write = write
-        self.func_label = tkinter.Label(text='Enter the name of the function to add:')
-        self.func_label.pack()
-        self.func_box = tkinter.Entry()
-        self.func_box.pack()
-        self.arg_label = tkinter.Label(text='Arguments, separated by commas')
-        self.arg_label.pack()
-        self.arg_box = tkinter.Entry()
-        self.arg_box.pack()
-        self.button = tkinter.Button(text="Add", command=self.on_stop)
-        self.button.pack()
-
-        self.func_box.focus()
-
-        self.title('Add Function')
-        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'resources', 'icon.png')
-        self.iconphoto(False, tkinter.PhotoImage(file=path))
-
-    def on_stop(self):
-        self.write.send(self.func_box.get() + chr(23) + self.arg_box.get())
-        self.destroy()
-
-    @classmethod
-    def run(cls, write: Connection):
-        dialog = cls(write)
-        dialog.mainloop()
-
-
-class PositionDialog(tkinter.Tk):
-    def __init__(self, write: Connection):
-        super(PositionDialog, self).__init__()
-        self.write = write
-        self.pos_label = tkinter.Label(text='Position to travel to (x, y, rotation [optional]):')
-        self.pos_label.pack()
-        self.pos_box = tkinter.Entry()
-        self.pos_box.pack()
-        self.button = tkinter.Button(text="Add", command=self.on_stop)
-        self.button.pack()
-
-        self.pos_box.focus()
-
-        self.title('Add Function')
-        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'resources', 'icon.png')
-        self.iconphoto(False, tkinter.PhotoImage(file=path))
-
-    def on_stop(self):
-        self.write.send(self.pos_box.get())
-        self.destroy()
-
-    @classmethod
-    def run(cls, write: Connection):
-        dialog = cls(write)
-        dialog.mainloop()
-
-
-class Movement:
-    def __init__(self, action: ActionType, direction: Direction, amount: any, state: tuple, arguments=''):
-        self.action = action
-        self.direction = direction
-        self.amount = amount
-        self.arguments = arguments
+    def clear(self):
+        if self.vertex_list is not None:
+            self.vertex_list.delete()
+            self.vertex_list = None
+
+
+class Robot:
+    def __init__(self, spec: RobotSpec, trajectory: Trajectory, sprite: pyglet.sprite.Sprite,
+                 ghost: pyglet.sprite.Sprite, trail: Trail, curves: Curves, field: Field):
+        self.spec = spec
+        self.trajectory = trajectory
+        self.sprite = sprite
+        self.ghost = ghost
+        self.trail = trail
+        self.curves = curves
+        self.field = field
+
+
+class Prompt:
+    def __init__(self, x: float, y: float, width: float, font_size: int, batch: pyglet.graphics.Batch,
+                 background_group: pyglet.graphics.Group, text_group: pyglet.graphics.Group):
+        self.fields = []
+        self.defaults = ()
+        self.values = []
+        self.callback = None
+
+        # the text layout clips with glScissor, which only takes whole pixels
+        x, y, width = int(x), int(y), int(width)
+        font = pyglet.font.load(None, font_size)
+        row = int(font.ascent - font.descent)
+        padding = row // 2
+        self.background = pyglet.shapes.Rectangle(
+            x, y, width, row * 2 + padding * 3,
+            color=(40, 40, 40),
+            batch=batch, group=background_group
+        )
+        self.background.opacity = 230
+        self.title = pyglet.text.Label(
+            font_size=font_size,
+            x=x + padding, y=y + padding * 2 + row - font.descent,
+            color=(255, 255, 255, 255),
+            batch=batch, group=text_group
+        )
+        self.document = pyglet.text.document.UnformattedDocument()
+        self.document.set_style(0, 0, dict(color=(255, 255, 255, 255), font_size=font_size))
+        self.layout = pyglet.text.layout.IncrementalTextLayout(
+            self.document, width - padding * 2, row,
+            batch=batch, group=text_group
+        )
+        self.layout.x, self.layout.y = x + padding, y + padding
+        self.caret = pyglet.text.caret.Caret(self.layout, color=(255, 255, 255))
+        self.caret.PERIOD = 0
+        self.hide()
+
+    @property
+    def active(self) -> bool:
+        return self.callback is not None
+
+    def open(self, fields: list, callback, defaults: list = ()):
+        self.fields = fields
+        self.defaults = defaults
+        self.values = []
+        self.callback = callback
+        self.show_field()
+        self.background.visible = self.title.visible = self.caret.visible = True
+
+    def show_field(self):
+        index = len(self.values)
+        self.title.text = self.fields[index]
+        self.document.text = self.defaults[index] if index < len(self.defaults) else ''
+        self.caret.position = len(self.document.text)
+
+    def hide(self):
+        self.callback = None
+        self.document.text = ''
+        self.background.visible = self.title.visible = self.caret.visible = False
+
+    def submit(self):
+        self.values.append(self.document.text)
+        if len(self.values) < len(self.fields):
+            self.show_field()
+        else:
+            callback = self.callback
+            self.hide()
+            callback(*self.values)
 
-        try:
-            self.amount = round(amount, 4)
-        except TypeError:
-            pass
-
-        self.state = state
-
-    def __repr__(self):
-        if self.action == ActionType.MOVEMENT:
-            if self.direction == Direction.VERTICAL:
-                if self.amount > 0:
-                    return f"move forwards {round(abs(self.amount * 39.37), 4)}"
-                elif self.amount < 0:
-                    return f"move backwards {round(abs(self.amount * 39.37), 4)}"
-            elif self.direction == Direction.HORIZONTAL:
-                if self.amount > 0:
-                    return f"move right {round(abs(self.amount * 39.37), 4)}"
-                elif self.amount < 0:
-                    return f"move left {round(abs(self.amount * 39.37), 4)}"
-            elif self.direction == Direction.POSITIONAL:
-                if len(self.amount) == 2:
-                    return f"line to {round(self.amount[0] * 39.37, 4)}, {round(self.amount[1] * 39.37, 4)}"
-                elif len(self.amount) == 3:
-                    return f"line to {round(self.amount[0] * 39.37, 4)}, {round(self.amount[1] * 39.37, 4)}, heading {round(math.degrees(self.amount[2]), 4)}"
-
-        elif self.action == ActionType.ROTATION:
-            if self.amount > 0:
-                return f"turn right {round(math.degrees(abs(self.amount)), 4)}"
-            elif self.amount < 0:
-                return f"turn left {round(math.degrees(abs(self.amount)), 4)}"
-
-        elif self.action == ActionType.SLEEP:
-            return f"wait {abs(self.amount)}"
-
-        elif self.action == ActionType.FUNCTION:
-            return f"execute {self.amount} ({self.arguments})"
-
-        return "[Error]: " + str(self.amount)
-
-    def to_code(self):
-        if self.action == ActionType.MOVEMENT:
-            if self.direction == Direction.VERTICAL:
-                if self.amount > 0:
-                    return f".forward({round(self.amount * 39.37, 4)})"
-                elif self.amount < 0:
-                    return f".back({round(abs(self.amount) * 39.37, 4)})"
-            elif self.direction == Direction.HORIZONTAL:
-                if self.amount > 0:
-                    return f".strafeRight({round(self.amount * 39.37, 4)})"
-                elif self.amount < 0:
-                    return f".strafeLeft({round(abs(self.amount) * 39.37, 4)})"
-            elif self.direction == Direction.POSITIONAL:
-                if len(self.amount) == 2:
-                    return f".lineTo(new Vector2d({self.amount}))"
-                elif len(self.amount) == 3:
-                    return f".lineToLinearHeading(new Pose2d{self.amount})"
-
-        elif self.action == ActionType.ROTATION:
-            return f".turn({-self.amount})"
-        elif self.action == ActionType.SLEEP:
-            return f".waitSeconds({self.amount})"
-        elif self.action == ActionType.FUNCTION:
-            return f".addDisplacementMarker(() -> {self.amount}({self.arguments}))"
-
-    def __add__(self, other):
-        return Movement(self.action, self.direction, self.amount + other.amount, self.state)
+    def on_text(self, text: str):
+        if text not in '\r\n':
+            self.caret.on_text(text)
+
+    def on_key_release(self, symbol: int):
+        if symbol in (key.ENTER, key.NUM_ENTER):
+            self.submit()
+        elif symbol == key.ESCAPE:
+            self.hide()
 
 
 class Application(pyglet.window.Window):
-    def __init__(self, width: int, height: int):
+    HANDLE_RADIUS = 8
+    SNAP_RADIUS = 10
+
+    def __init__(self, width: int, height: int, record: str = None, profile: bool = False):
         super(Application, self).__init__(width=width, height=height)
 
         # initialize window and application
         self.dragging = False
-        self.drag_direction = None
-        self.setup = False
-        self.held_keys = key.KeyStateHandler()
-        with open(os.path.join(os.path.dirname(__file__), 'config.json'), 'r') as config:
-            self.settings = json.load(config)
+        self.config_path = os.path.join(os.path.dirname(__file__), 'config.json')
+        self.config_stamp = self.config_time = None
+        self.settings, errors = config.load(self.config_path)
+        if errors:
+            raise ValueError("\n".join(errors))
+        self.config_stamp = self.stamp()
+        self.config_time = time.perf_counter()
         self.set_caption("RoboticsGUI")
-        path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'resources', 'icon.png')
-        self.set_icon(pyglet.image.load(path))
+        directory = os.path.abspath(os.path.dirname(__file__))
+        self.assets = Assets(
+            os.path.join(directory, 'resources'), os.path.join(directory, self.settings['cache_directory'])
+        )
+        self.set_icon(self.assets.image_data('icon.png'))
+        self.tk_root = None
+        self.dirty = True
+        self.last_frame = 0
+        self.frame_time = 1 / self.settings['max_fps'] if self.settings['max_fps'] > 0 else 0
 
         # initialize field variables
-        self.speed = self.settings['robot_speed']
-        self.rotation_speed = self.settings['robot_turn_speed']
         self.tileSize = 0.6096
         self.pixel_per_meter = self.height / (self.tileSize * 6)
         self.backgroundBatch = pyglet.graphics.Batch()
         self.foregroundBatch = pyglet.graphics.Batch()
-        path = os.path.join(os.path.dirname(__file__), 'resources', 'field.png')
-        self.background = pyglet.sprite.Sprite(pyglet.image.load(path), 0, 0, batch=self.backgroundBatch)
+        self.circle_group = pyglet.graphics.OrderedGroup(0)
+        self.line_group = pyglet.graphics.OrderedGroup(1)
+        self.robot_group = pyglet.graphics.OrderedGroup(2)
+        self.label_group = pyglet.graphics.OrderedGroup(3)
+        self.prompt_group = pyglet.graphics.OrderedGroup(4)
+        self.prompt_text_group = pyglet.graphics.OrderedGroup(5)
         self.field_size = round(self.tileSize * self.pixel_per_meter * 6)
-        self.background.scale_x = self.field_size / self.background.width
-        self.background.scale_y = self.field_size / self.background.height
+        self.background = pyglet.sprite.Sprite(
+            self.assets.image('field.png', self.field_size, self.field_size), 0, 0, batch=self.backgroundBatch
+        )
         self.mouse_pos_mode = False
         self.mouse_pos = self.field_size / 2, self.field_size / 2
+        self.snaps = None
+        self.snapped = None
         mx, my = self.mouse_pos
         self.set_mouse_position(int(mx), int(my))
 
         # initialize objects
-        width = self.settings['robot_width'] * self.pixel_per_meter / 39.37
-        length = self.settings['robot_length'] * self.pixel_per_meter / 39.37
-        path = os.path.join(os.path.dirname(__file__), 'resources', 'robot.png')
-        image = pyglet.image.load(path)
-        image.anchor_x, image.anchor_y = round(image.width / 2), round(image.height / 2)
         self.center_x = self.center_y = self.field_size / 2
-        self.robot = pyglet.sprite.Sprite(image, self.center_x, self.center_y, batch=self.foregroundBatch)
-        self.robot.scale_x, self.robot.scale_y = width / self.robot.width, length / self.robot.height
-        self.robot.opacity = 200
-        self.robot.rotation = 90
-        self.starting_position = self.center_x, self.center_y, 0
+        obstacles = [Obstacle.from_settings(obstacle) for obstacle in self.settings['obstacles']]
+        self.robots = [self.create_robot(spec, obstacles) for spec in robot_specs(self.settings)]
+        self.simulation = Simulation(
+            self.robots[0].trajectory, self.robots[0].spec.speed, self.robots[0].spec.rotation_speed,
+            self.settings['update_rate'], Recorder(record) if record else None
+        )
+        for index, robot in enumerate(self.robots):
+            self.simulation.trajectories[index] = robot.trajectory
+        self.active = 0
+        self.robot = self.robots[0].sprite
+        self.trajectory = self.robots[0].trajectory
+        self.trail = self.robots[0].trail
+        self.field = self.robots[0].field
+        self.timeline = None
+        self.timeline_time = None
+        self.interference = []
+        self.constraints = Constraints.from_settings(self.settings)
+        self.collisions = []
+        self.library = Library(os.path.join(os.path.dirname(__file__), self.settings['routine_directory']))
+        # per movement seconds, and the first index whose time and limits are out of date
+        self.times = None
+        self.stale = None
+        self.runtime = 0
+        self.violations = None
+        self.notice = None
+        self.log = None
+        self.deviations = None
+        self.log_time = 0
+        self.log_path = LogPath(
+            self.center_x, self.center_y, self.pixel_per_meter, self.foregroundBatch, self.line_group
+        )
+        self.snap_marker = pyglet.shapes.Circle(
+            0, 0, 4, color=(255, 255, 255), batch=self.foregroundBatch, group=self.label_group
+        )
+        self.snap_marker.visible = False
         self.position_label = pyglet.text.Label(
             text=f"Pose: {self.calculate_position()}",
             font_size=self.settings['font_size'],
             x=0, y=0,
             color=(0, 100, 0, 255),
-            bold=True
+            bold=True,
+            batch=self.foregroundBatch,
+            group=self.label_group
         )
 
         # storage variables
-        self.movements = []
-        self.console = pyglet.text.document.FormattedDocument()
-        self.console_box = pyglet.text.layout.TextLayout(
-            self.console,
+        self.console = Console(
+            self.field_size, 0,
             self.width - self.field_size, self.field_size,
-            multiline=True,
-            batch=self.foregroundBatch
+            self.settings['font_size'],
+            self.foregroundBatch,
+            self.robot_group
+        )
+
+        self.prompt = Prompt(
+            0, self.field_size * 7 / 8, self.field_size * 5 / 8,
+            self.settings['font_size'],
+            self.foregroundBatch,
+            self.prompt_group,
+            self.prompt_text_group
         )
-        self.console_box.x, self.console_box.y = self.field_size, 0
 
         # Circles and lines
         self.mode = 0
         self.circles = []
+        self.lines = []
+        self.build_guides()
+        self.obstacles = []
+        self.build_obstacles(obstacles)
+        self.config_label = pyglet.text.Label(
+            font_size=self.settings['font_size'] * 3 // 4,
+            x=0, y=self.field_size - self.settings['font_size'] * 2, anchor_y='top',
+            width=self.field_size, multiline=True,
+            color=(255, 80, 80, 255),
+            batch=self.foregroundBatch,
+            group=self.label_group
+        )
+        self.config_label.visible = False
+
+        self.profiler = Profiler(enabled=profile)
+        self.draw_calls = 0
+        self.profile = profile
+        self.draw_functions = []
+        self.hud_time = 0
+        self.hud = pyglet.text.Label(
+            font_size=self.settings['font_size'] * 3 // 4,
+            x=0, y=self.field_size, anchor_y='top',
+            color=(255, 255, 0, 255),
+            batch=self.foregroundBatch,
+            group=self.label_group
+        )
+        self.hud.visible = False
+        for name in ('on_update', 'on_draw', 'update_label', 'get_code', 'check_limits'):
+            setattr(self, name, self.profiler.wrap(getattr(self, name)))
+        for name in ('append', 'replace_last', 'pop', 'insert', 'delete', 'scroll'):
+            setattr(self.console, name, self.profiler.wrap(getattr(self.console, name), f"console.{name}"))
+        self.simulation.step = self.profiler.wrap(self.simulation.step, 'simulation.step')
+        self.invalidate()
+
+    def schedule(self):
+        # updates run at the frame cap, or once a simulation step without one
+        pyglet.clock.unschedule(self.on_update)
+        pyglet.clock.schedule_interval(self.on_update, self.frame_time or self.simulation.timestep)
+
+    def stamp(self):
+        try:
+            status = os.stat(self.config_path)
+        except OSError:
+            return None
+        return status.st_mtime_ns, status.st_size
+
+    def check_config(self):
+        self.config_time = time.perf_counter()
+        stamp = self.stamp()
+        if stamp == self.config_stamp:
+            return
+        self.config_stamp = stamp
+        settings, errors = config.load(self.config_path)
+        if errors:
+            # the last good settings stay in use until the file is fixed
+            shown = errors[:4] + ([f"and {len(errors) - 4} more"] if len(errors) > 4 else [])
+            self.show_config_message("config.json not applied:\n" + "\n".join(shown))
+            return
+        restart = self.apply_settings(settings)
+        if restart:
+            self.show_config_message(f"Restart to apply {', '.join(sorted(restart))}")
+        else:
+            self.config_label.visible = False
+        self.sync_robot()
+        self.invalidate()
+
+    def show_config_message(self, text: str):
+        self.config_label.text = text
+        self.config_label.visible = True
+        self.dirty = True
+
+    def apply_settings(self, settings: dict) -> set:
+        changed = config.changes(self.settings, settings)
+        self.settings = settings
+
+        robots = bool(changed & {'robots', 'robot_width', 'robot_length', 'robot_speed', 'robot_turn_speed'})
+        if robots or 'obstacles' in changed:
+            obstacles = [Obstacle.from_settings(obstacle) for obstacle in settings['obstacles']]
+            self.update_robots(obstacles)
+            if 'obstacles' in changed:
+                self.build_obstacles(obstacles)
+        if robots or 'lines' in changed:
+            self.build_guides()
+        if changed & {'max_velocity', 'max_acceleration', 'max_angular_velocity', 'max_angular_acceleration',
+                      'max_jerk', 'max_centripetal_acceleration', 'track_width', 'lateral_multiplier'}:
+            self.constraints = Constraints.from_settings(settings)
+            self.times = None
+            self.violations = None
+            self.timeline = None
+            self.close_timeline()
+        if 'update_rate' in changed:
+            self.simulation.retime(settings['update_rate'])
+            self.schedule()
+        if 'max_fps' in changed:
+            self.frame_time = 1 / settings['max_fps'] if settings['max_fps'] > 0 else 0
+            self.schedule()
+        if 'routine_directory' in changed:
+            self.library = Library(os.path.join(os.path.dirname(__file__), settings['routine_directory']))
+        return changed & {'font_size', 'history_depth', 'cache_directory'}
+
+    def update_robots(self, obstacles: list):
+        specs = robot_specs(self.settings)
+        for index, spec in enumerate(specs):
+            if index < len(self.robots):
+                self.update_robot(self.robots[index], spec, obstacles)
+            else:
+                self.robots.append(self.create_robot(spec, obstacles))
+                self.simulation.trajectories[index] = self.robots[index].trajectory
+        for index in range(len(specs), len(self.robots)):
+            robot = self.robots[index]
+            robot.sprite.delete()
+            robot.ghost.delete()
+            robot.trail.vertex_list.delete()
+            robot.curves.vertex_list.delete()
+            del self.simulation.trajectories[index]
+        del self.robots[len(specs):]
+        self.timeline = None
+        self.close_timeline()
+        self.select_robot(min(self.active, len(self.robots) - 1))
+
+    def update_robot(self, robot: Robot, spec: RobotSpec, obstacles: list):
+        if (spec.width, spec.length) != (robot.spec.width, robot.spec.length):
+            width, length = spec.width * self.pixel_per_meter, spec.length * self.pixel_per_meter
+            image = self.assets.image('robot.png', max(1, round(width)), max(1, round(length)))
+            image.anchor_x, image.anchor_y = round(image.width / 2), round(image.height / 2)
+            for sprite in (robot.sprite, robot.ghost):
+                sprite.image = image
+                sprite.scale_x, sprite.scale_y = width / image.width, length / image.height
+        robot.spec = spec
+        robot.trajectory.origin = spec.start
+        robot.field = Field(self.tileSize * 6, spec.width, spec.length, obstacles)
+
+    def build_guides(self):
+        for shape in self.circles + self.lines:
+            shape.delete()
+        self.circles = []
+        self.lines = []
         for line in self.settings['lines']:
             circle = pyglet.shapes.Circle(
                 self.robot.x,
                 self.robot.y,
-                line['length'] / 39.37 * self.pixel_per_meter,
-                color=line['color']
+                line['length'] / INCHES_PER_METER * self.pixel_per_meter,
+                color=line['color'],
+                batch=self.foregroundBatch,
+                group=self.circle_group
             )
             circle.opacity = 100
             self.circles.append(circle)
+            self.lines.append(pyglet.shapes.Line(
+                self.robot.x, self.robot.y, self.robot.x, self.robot.y,
+                line['width'], tuple(line['color']),
+                batch=self.foregroundBatch,
+                group=self.line_group
+            ))
         radius = ((self.robot.width ** 2 + self.robot.height ** 2) ** 0.5) / 2
-        turn_circle = pyglet.shapes.Circle(self.robot.x, self.robot.y, radius, color=(139, 54, 54))
+        turn_circle = pyglet.shapes.Circle(
+            self.robot.x, self.robot.y, radius, color=(139, 54, 54),
+            batch=self.foregroundBatch, group=self.circle_group
+        )
         turn_circle.opacity = 150
         self.circles.append(turn_circle)
 
+    def build_obstacles(self, obstacles: list):
+        for rectangle in self.obstacles:
+            rectangle.delete()
+        self.obstacles = []
+        for obstacle in obstacles:
+            rectangle = pyglet.shapes.Rectangle(
+                self.center_x + obstacle.x * self.pixel_per_meter, self.center_y + obstacle.y * self.pixel_per_meter,
+                obstacle.length * self.pixel_per_meter, obstacle.width * self.pixel_per_meter,
+                color=(200, 120, 0),
+                batch=self.foregroundBatch, group=self.circle_group
+            )
+            rectangle.anchor_position = rectangle.width / 2, rectangle.height / 2
+            rectangle.rotation = -math.degrees(obstacle.angle)
+            rectangle.opacity = 120
+            self.obstacles.append(rectangle)
+
+    def create_robot(self, spec: RobotSpec, obstacles: list) -> Robot:
+        width = spec.width * self.pixel_per_meter
+        length = spec.length * self.pixel_per_meter
+        image = self.assets.image('robot.png', max(1, round(width)), max(1, round(length)))
+        image.anchor_x, image.anchor_y = round(image.width / 2), round(image.height / 2)
+        sprite, ghost = (
+            pyglet.sprite.Sprite(image, batch=self.foregroundBatch, group=self.robot_group) for _ in range(2)
+        )
+        sprite.scale_x, sprite.scale_y = width / sprite.width, length / sprite.height
+        ghost.scale_x, ghost.scale_y = sprite.scale_x, sprite.scale_y
+        ghost.opacity = 90
+        ghost.visible = False
+
+        trajectory = Trajectory(spec.start, history_depth=self.settings['history_depth'])
+        robot = Robot(
+            spec, trajectory, sprite, ghost,
+            Trail(self.center_x, self.center_y, self.pixel_per_meter, self.foregroundBatch, self.circle_group),
+            Curves(self.center_x, self.center_y, self.pixel_per_meter, self.foregroundBatch, self.circle_group),
+            Field(self.tileSize * 6, spec.width, spec.length, obstacles)
+        )
+        trajectory.listeners.append(functools.partial(self.on_trajectory_change, robot))
+        self.place(sprite, trajectory.pose)
+        sprite.opacity = 200
+        return robot
+
+    def place(self, sprite: pyglet.sprite.Sprite, pose: tuple):
+        x, y, heading = pose
+        sprite.update(
+            x=self.center_x + x * self.pixel_per_meter,
+            y=self.center_y + y * self.pixel_per_meter,
+            rotation=-math.degrees(heading) + 90
+        )
+
+    def select_robot(self, index: int):
+        self.flag_limits(self.robots[min(self.active, len(self.robots) - 1)], {})
+        robot = self.robots[index]
+        self.active = index
+        self.robot, self.trajectory, self.trail, self.field = robot.sprite, robot.trajectory, robot.trail, robot.field
+        self.simulation.select(index, robot.spec.speed, robot.spec.rotation_speed, robot.spec.start)
+        self.times = None
+        self.violations = None
+        self.deviations = None
+        self.snaps = None
+        self.circles[-1].radius = ((self.robot.width ** 2 + self.robot.height ** 2) ** 0.5) / 2
+        self.console.clear()
+        for movement in self.trajectory.movements:
+            if movement.action != ActionType.VOID:
+                self.console.append(str(movement))
+
+    def scrub(self, seconds: float):
+        if self.timeline is None:
+            self.timeline = Timeline(self.constraints)
+            for robot in self.robots:
+                self.timeline.add(robot.spec, robot.trajectory.movements, robot.trajectory.start,
+                                  robot.trajectory.end_pose())
+            self.interference = self.timeline.interference()
+        time = 0.0 if self.timeline_time is None else self.timeline_time
+        self.timeline_time = min(max(time + seconds, 0.0), self.timeline.duration)
+        for robot, pose in zip(self.robots, self.timeline.poses(self.timeline_time)):
+            self.place(robot.ghost, pose)
+            robot.ghost.visible = True
+
+    def close_timeline(self):
+        self.timeline_time = None
+        for robot in self.robots:
+            robot.ghost.visible = False
+
+    def start_profiling(self):
+        self.profiler.enabled = True
+        if not self.draw_functions:
+            for module in (pyglet.graphics, pyglet.graphics.vertexdomain):
+                for name in ('glDrawArrays', 'glDrawElements', 'glMultiDrawArrays', 'glMultiDrawElements'):
+                    if hasattr(module, name):
+                        self.draw_functions.append((module, name, getattr(module, name)))
+                        setattr(module, name, self.count_draw_call(getattr(module, name)))
+
+    def stop_profiling(self):
+        # pyglet's draw functions are shared, so they are put back as soon as they are not counted
+        for module, name, function in self.draw_functions:
+            setattr(module, name, function)
+        self.draw_functions = []
+        self.profiler.enabled = self.profile
+
+    def count_draw_call(self, function):
+        def counted(*args):
+            self.draw_calls += 1
+            return function(*args)
+        return counted
+
+    def close(self):
+        self.stop_profiling()
+        super(Application, self).close()
+
+    def update_hud(self):
+        p50, p99 = self.profiler.percentile('frame', 50), self.profiler.percentile('frame', 99)
+        update = self.profiler.percentile('on_update', 99)
+        text = f"frame {p50 * 1000:.2f} / {p99 * 1000:.2f} ms p50/p99  update p99 {update * 1000:.2f} ms  " \
+               f"draw calls {self.draw_calls}  movements {len(self.trajectory.movements)}"
+        if text != self.hud.text:
+            self.hud.text = text
+            self.dirty = True
+
     def calculate_position(self):
-        x, y = ((self.robot.x - self.center_x) / self.pixel_per_meter) * 39.37, (
-                (self.robot.y - self.center_y) / self.pixel_per_meter) * 39.37
-        rotation = math.radians(-self.robot.rotation + 90)
+        x, y, rotation = self.trajectory.pose
+        x, y = x * INCHES_PER_METER, y * INCHES_PER_METER
         return round(x, 4), round(y, 4), round(rotation % (math.pi * 2), 4)
 
+    def sync_robot(self):
+        self.place(self.robot, self.trajectory.pose)
+        self.robot.opacity = 255 if self.trajectory.setup else 200
+        self.collisions = self.field.collisions(self.trajectory.pose)
+        self.robot.color = (255, 90, 90) if self.collisions else (255, 255, 255)
+
+    def on_trajectory_change(self, robot: Robot, change: Change, movement, rows: range = None):
+        # every robot keeps its trail, only the one being driven is listed in the console
+        listed = robot.trajectory is self.trajectory
+        if listed:
+            self.retime(change)
+            self.notice = None
+        self.deviations = None
+        self.log_time = time.perf_counter()
+        self.timeline = None
+        # a waypoint drag keeps the snap index it started with
+        if not (self.dragging and self.dragging[1] == 'waypoint'):
+            self.snaps = None
+        if self.timeline_time is not None:
+            self.close_timeline()
+        if change == Change.CLEAR:
+            if listed:
+                self.console.clear()
+            robot.trail.clear()
+            robot.curves.sync(robot.trajectory.movements)
+        elif change in (Change.UPDATE, Change.INSERT, Change.DELETE):
+            # console and trail rows skip separators
+            store = robot.trajectory.movements
+            if movement.action != ActionType.VOID:
+                row = store.row(rows.start)
+                moved = (store[index] for index in rows if store.actions[index] != ActionType.VOID.value)
+                if change == Change.UPDATE:
+                    if listed:
+                        self.console.replace(row, str(movement))
+                    robot.trail.rewrite(row, moved)
+                elif change == Change.INSERT:
+                    if listed:
+                        self.console.insert(row, str(movement))
+                    robot.trail.insert(row, moved)
+                else:
+                    if listed:
+                        self.console.delete(row)
+                    robot.trail.delete(row, moved)
+            robot.curves.sync(store)
+        elif movement.action != ActionType.VOID:
+            if change == Change.APPEND:
+                if listed:
+                    self.console.append(str(movement))
+                robot.trail.append(movement)
+            elif change == Change.REPLACE:
+                if listed:
+                    self.console.replace_last(str(movement))
+                robot.trail.replace_last(movement)
+            elif change == Change.REMOVE:
+                if listed:
+                    self.console.pop()
+                robot.trail.pop()
+            if movement.action == ActionType.SPLINE:
+                robot.curves.sync(robot.trajectory.movements)
+
+    def retime(self, change: Change):
+        # only a change at the end keeps the times and limits before it
+        count = len(self.trajectory.movements)
+        if change in (Change.APPEND, Change.REPLACE):
+            self.stale = count - 1 if self.stale is None else min(self.stale, count - 1)
+        elif change == Change.REMOVE:
+            if self.times is not None:
+                self.runtime -= sum(self.times[count:])
+                del self.times[count:]
+            self.stale = count if self.stale is None else min(self.stale, count)
+            if self.violations is not None:
+                self.violations.pop(count, None)
+        else:
+            self.times = None
+            self.violations = None
+
+    def update_times(self):
+        store = self.trajectory.movements
+        if self.times is None:
+            times, self.runtime = estimate(store, self.constraints)
+            self.times = times.tolist()
+            self.console.retime([self.times[index] for index in store.listed().tolist()])
+        elif self.stale is not None:
+            times, total = estimate(store, self.constraints, slice(self.stale, None))
+            self.runtime += total - sum(self.times[self.stale:])
+            self.times[self.stale:] = times.tolist()
+            for index in range(self.stale, len(store)):
+                if store.actions[index] != ActionType.VOID.value:
+                    self.console.time(store.row(index), self.times[index])
+
     def on_mouse_motion(self, x, y, dx, dy):
         self.mouse_pos = x, y
+        if self.mouse_pos_mode:
+            self.snap()
+            self.update_label()
+
+    def snap_index(self) -> SnapIndex:
+        if self.snaps is None:
+            self.snaps = SnapIndex(
+                self.SNAP_RADIUS / self.pixel_per_meter, self.tileSize, self.tileSize * 3, self.field.obstacles,
+                self.trajectory.movements
+            )
+        return self.snaps
 
-    def calculate_mouse_position(self):
+    def snap(self, exclude: int = None) -> tuple:
         x, y = self.mouse_pos
-        return round((x - self.field_size / 2) / self.pixel_per_meter * 39.37, 4), \
-            round((y - self.field_size / 2) / self.pixel_per_meter * 39.37, 4)
-
-    def on_update(self, dt: float):
-        angle = self.robot.rotation
-        position = self.robot.position
-
-        rotation = math.radians(self.robot.rotation)
-        x_mult = math.sin(rotation)
-        y_mult = math.cos(rotation)
-
-        p_rotation = rotation + math.pi / 2
-        p_x_mult = math.sin(p_rotation)
-        p_y_mult = math.cos(p_rotation)
-
-        distance = self.speed * self.pixel_per_meter * dt
-        rotation = self.rotation_speed * dt
+        x, y = (x - self.center_x) / self.pixel_per_meter, (y - self.center_y) / self.pixel_per_meter
+        self.snapped = self.snap_index().snap(x, y, exclude)
+        x, y, name = self.snapped
+        self.snap_marker.position = self.center_x + x * self.pixel_per_meter, self.center_y + y * self.pixel_per_meter
+        if self.snap_marker.visible != (name is not None):
+            self.snap_marker.visible = name is not None
+        self.dirty = True
+        return self.snapped
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        if self.prompt.active or button != pyglet.window.mouse.LEFT:
+            return
+        if self.console.contains(x, y):
+            self.console.select(self.console.row_at(y))
+            self.dirty = True
+        elif self.mouse_pos_mode and self.trajectory.setup and x < self.field_size:
+            self.place_waypoint(modifiers & key.MOD_SHIFT)
+        else:
+            self.dragging = self.robots[self.active].curves.grab(x, y, self.HANDLE_RADIUS)
+
+    def place_waypoint(self, heading: bool):
+        x, y, _ = self.snap()
+        row = self.snap_index().waypoint(x, y)
+        if row is not None:
+            self.dragging = row, 'waypoint'
+            return
+        x, y = tidy(x), tidy(y)
+        self.simulation.line_to(x, y, self.trajectory.pose[2] if heading else None)
+        self.dragging = len(self.trajectory.movements) - 1, 'heading' if heading else 'waypoint'
+        self.sync_robot()
+        self.invalidate()
+
+    def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
+        if self.prompt.active:
+            return
+        self.mouse_pos = x, y
+        if not self.dragging:
+            return
+        row, kind = self.dragging
+        x, y = (x - self.center_x) / self.pixel_per_meter, (y - self.center_y) / self.pixel_per_meter
+        store = self.trajectory.movements
+        target = store.amount(row)
+        if kind == 'waypoint':
+            x, y, _ = self.snap(exclude=row)
+            x, y = tidy(x), tidy(y)
+            if store.action(row) == ActionType.SPLINE:
+                self.simulation.edit_spline(row, x, y, target[2])
+            else:
+                self.simulation.modify(row, ActionType.MOVEMENT, Direction.POSITIONAL, (x, y) + tuple(target[2:]))
+        elif kind == 'heading':
+            heading = tidy(math.atan2(y - target[1], x - target[0]))
+            self.simulation.modify(row, ActionType.MOVEMENT, Direction.POSITIONAL, target[:2] + (heading,))
+        elif kind == 'point':
+            self.simulation.edit_spline(row, x, y, target[2])
+        else:
+            self.simulation.edit_spline(row, target[0], target[1], math.atan2(y - target[1], x - target[0]))
+        self.sync_robot()
+        self.invalidate()
 
-        action_type = None
-        direction = None
-        amount = 0
+    def on_mouse_release(self, x, y, button, modifiers):
+        if self.dragging:
+            # the whole drag is one undo step
+            self.dragging = False
+            self.snaps = None
+            self.simulation.checkpoint()
 
-        shifted = self.held_keys[key.LSHIFT] or self.held_keys[key.RSHIFT]
+    def calculate_mouse_position(self):
+        if self.snapped is not None:
+            x, y, _ = self.snapped
+        else:
+            x, y = self.mouse_pos
+            x, y = (x - self.center_x) / self.pixel_per_meter, (y - self.center_y) / self.pixel_per_meter
+        return tidy(x * INCHES_PER_METER), tidy(y * INCHES_PER_METER)
 
-        if shifted:
-            distance *= 0.25
+    def on_update(self, dt: float):
+        pose = self.trajectory.pose
+
+        if self.prompt.active:
+            return
+
+        self.simulation.update(dt)
+        if self.trajectory.pose != pose:
+            self.sync_robot()
+            self.invalidate()
+
+        if time.perf_counter() - self.config_time > 1:
+            self.check_config()
+
+        # the log is compared again once edits settle, not every frame a key is held
+        if self.log is not None and self.deviations is None and time.perf_counter() - self.log_time > 0.25:
+            self.compare_log()
+            self.update_label()
+
+        if self.hud.visible and time.perf_counter() - self.hud_time > 0.25:
+            self.hud_time = time.perf_counter()
+            self.update_hud()
+
+    def invalidate(self):
+        self.update_guides()
+        self.update_label()
+        self.dirty = True
+
+    def update_guides(self):
+        for circle in self.circles:
+            circle.visible = self.mode == 2
+            if circle.visible:
+                circle.position = self.robot.position
+        for shape, line in zip(self.lines, self.settings['lines']):
+            shape.visible = self.mode > 0
+            if shape.visible:
+                shape.position = self.line_to(line['length'] / INCHES_PER_METER, line['angle'])
+
+    def update_label(self):
+        if self.mouse_pos_mode:
+            text = f"Mouse Position: {self.calculate_mouse_position()}"
+            if self.snapped is not None and self.snapped[2] is not None:
+                text += f" on {self.snapped[2]}"
+        else:
+            text = f"Pose: {self.calculate_position()}"
+        self.update_times()
+        text += f"  Time: {self.runtime:.2f}s / {self.settings['autonomous_time']}s"
+        self.check_limits()
+        self.stale = None
+        if self.violations:
+            text += f"  Over limits: {len(self.violations)} movements"
+        if self.log is not None:
+            text += self.describe_log()
+        if self.collisions:
+            text += f"  Hitting: {', '.join(self.collisions)}"
+        if self.notice:
+            text += f"  {self.notice}"
+        if len(self.robots) > 1:
+            text = f"{self.robots[self.active].spec.name}  " + text
+        if self.timeline_time is not None:
+            text += f"  Timeline: {self.timeline_time:.2f}s / {self.timeline.duration:.2f}s"
+            meeting = [
+                f"{a} & {b}" for start, end, a, b in self.interference if start <= self.timeline_time <= end
+            ]
+            if meeting:
+                text += f"  Colliding: {', '.join(meeting)}"
+            else:
+                upcoming = [start for start, _, _, _ in self.interference if start > self.timeline_time]
+                if upcoming:
+                    text += f"  Next collision: {upcoming[0]:.2f}s"
+        if text != self.position_label.text:
+            self.position_label.text = text
+            self.dirty = True
+
+    def check_limits(self):
+        store = self.trajectory.movements
+        if self.violations is None:
+            self.violations = violations(store, self.constraints)
+            self.console.flag(self.flag_limits(self.robots[self.active], self.violations))
+        elif self.stale is not None:
+            for index in range(self.stale, len(store)):
+                self.violations.pop(index, None)
+            broken = violations(store, self.constraints, rows=slice(self.stale, None))
+            self.violations.update(broken)
+            self.console.flag(self.flag_limits(self.robots[self.active], broken, self.stale), store.row(self.stale))
+
+    def flag_limits(self, robot: Robot, broken: dict, first: int = 0) -> dict:
+        store = robot.trajectory.movements
+        listed = store.listed()
+        rows = {store.row(index): ", ".join(names) for index, names in broken.items()}
+        robot.trail.flag(rows.keys(), lambda row: store[int(listed[row])], store.row(first))
+        robot.curves.flag(broken.keys(), first=first)
+        return rows
+
+    def compare_log(self):
+        store = self.trajectory.movements
+        robot = self.robots[self.active].spec
+        spacing = min(robot.width, robot.length) / 4
+        movement, planned = self.field.sample_path(store, self.trajectory.end_pose(), spacing)
+        if len(planned) == 0:
+            self.deviations = np.zeros(0), np.zeros(0)
         else:
-            if self.held_keys[key.Q]:
-                self.robot.rotation -= rotation
-                action_type = ActionType.ROTATION
-                direction = Direction.VOID
-                amount = -math.radians(rotation)
-
-            elif self.held_keys[key.E]:
-                self.robot.rotation += rotation
-                action_type = ActionType.ROTATION
-                direction = Direction.VOID
-                amount = math.radians(rotation)
-
-        if action_type != ActionType.ROTATION:
-            if self.held_keys[key.W]:
-                self.robot.x += distance * x_mult
-                self.robot.y += distance * y_mult
-                action_type = ActionType.MOVEMENT
-                direction = Direction.VERTICAL
-                amount = distance / self.pixel_per_meter
-
-            elif self.held_keys[key.S]:
-                self.robot.x -= distance * x_mult
-                self.robot.y -= distance * y_mult
-                action_type = ActionType.MOVEMENT
-                direction = Direction.VERTICAL
-                amount = -distance / self.pixel_per_meter
-
-            elif self.held_keys[key.A]:
-                self.robot.x -= distance * p_x_mult
-                self.robot.y -= distance * p_y_mult
-                action_type = ActionType.MOVEMENT
-                direction = Direction.HORIZONTAL
-                amount = -distance / self.pixel_per_meter
-
-            elif self.held_keys[key.D]:
-                self.robot.x += distance * p_x_mult
-                self.robot.y += distance * p_y_mult
-                action_type = ActionType.MOVEMENT
-                direction = Direction.HORIZONTAL
-                amount = distance / self.pixel_per_meter
-
-        if amount != 0:
-            self.add_movement(amount, action_type, direction, (position, angle))
-
-    def add_movement(self, amount: float, action_type: ActionType, direction: Direction, state: tuple, arguments=''):
-        if self.setup:
-            movement = Movement(action_type, direction, amount, state, arguments)
-            if direction != Direction.POSITIONAL:
-                if len(self.movements) > 0:
-                    previous = self.movements[-1]
-                    same_direction = previous.direction == direction
-                    if previous.action == action_type and same_direction and action_type != ActionType.FUNCTION:
-                        movement = self.movements.pop(-1) + movement
-
-            if movement.action == ActionType.FUNCTION or movement.amount != 0:
-                self.movements.append(movement)
-            self.update_console()
-
-    def on_render(self, dt: float):
+            self.deviations = deviation(self.log, movement, planned, len(store))
+
+    def log_rows(self) -> list:
+        mean, worst = self.deviations
+        listed = self.trajectory.movements.listed()
+        rows = np.flatnonzero(np.isfinite(worst[listed]))
+        return [
+            (row, mean[index] * INCHES_PER_METER, worst[index] * INCHES_PER_METER)
+            for row, index in zip(rows.tolist(), listed[rows].tolist())
+        ]
+
+    def describe_log(self) -> str:
+        if self.deviations is None:
+            return "  Log: updating"
+        rows = self.log_rows()
+        if not rows:
+            return "  Log: nothing planned"
+        row, _, worst = max(rows, key=lambda item: item[2])
+        return f"  Log: up to {worst:.2f} in off at {row + 1}"
+
+    def open_log(self, path: str):
+        path = path.strip()
+        if not path:
+            self.log = self.deviations = None
+            self.log_path.clear()
+            self.invalidate()
+            return
+        start = time.perf_counter()
+        try:
+            _, poses = load_log(path)
+        except (OSError, ValueError) as error:
+            self.open_prompt([f'Could not load ({error}), telemetry log:'], self.open_log, [path])
+            return
+        self.log = poses[decimate(poses, self.pixel_per_meter)]
+        self.compare_log()
+        self.notice = f"Loaded {len(poses)} samples in {time.perf_counter() - start:.3f}s"
+        self.log_path.show(self.log)
+        self.invalidate()
+
+    def redraw(self):
+        if not self.dirty:
+            return None
+        remaining = self.frame_time - (time.perf_counter() - self.last_frame)
+        if remaining > 0:
+            return remaining
+        start = time.perf_counter()
+        self.draw_calls = 0
+        self.switch_to()
+        self.dispatch_event('on_draw')
+        self.flip()
+        self.dirty = False
+        self.last_frame = time.perf_counter()
+        if self.profiler.enabled:
+            self.profiler.record('frame', self.last_frame - start)
+        return None
+
+    def on_draw(self):
         self.clear()
         self.backgroundBatch.draw()
-        if self.mode > 0:
-            if self.mode == 2:
-                for circle in self.circles:
-                    circle.position = self.robot.position
-                    circle.draw()
-            for line in self.settings['lines']:
-                self.line_to(line['length'] / 39.37, line['angle'], line['width'], tuple(line['color'])).draw()
         self.foregroundBatch.draw()
-        if self.mouse_pos_mode:
-            self.position_label.text = f"Mouse Position: {self.calculate_mouse_position()}"
-        else:
-            self.position_label.text = f"Pose: {self.calculate_position()}"
-        self.position_label.draw()
+
+    def on_expose(self):
+        self.dirty = True
 
     def on_key_press(self, symbol, modifiers):
-        self.held_keys[symbol] = True
+        if not self.prompt.active:
+            self.simulation.press(
+                key.symbol_string(symbol), bool(modifiers & key.MOD_SHIFT), bool(modifiers & key.MOD_ACCEL)
+            )
 
-    def get_code(self):
-        x, y, rotation = self.starting_position
-        x, y = ((x - self.center_x) / self.pixel_per_meter) * 39.37, (
-                (y - self.center_y) / self.pixel_per_meter) * 39.37
-        header = f"""SampleMecanumDrive drive = new SampleMecanumDrive(hardwareMap);
-drive.setPoseEstimate(new Pose2d({x}, {y}, {math.radians(-rotation + 90)}));
-TrajectorySequence trajectory = drive.trajectorySequenceBuilder(drive.getPoseEstimate())
-    """
-        code = [
-            movement.to_code()
-            for movement in self.movements
-            if movement.action != ActionType.VOID
-        ]
+    def open_prompt(self, fields: list, callback, defaults: list = ()):
+        # keys let go while typing never reach the simulation
+        self.simulation.release_all()
+        self.prompt.open(fields, callback, defaults)
 
-        code.append(
-            ".build();"
-        )
+    def on_text(self, text):
+        if self.prompt.active:
+            self.prompt.on_text(text)
+            self.dirty = True
+
+    def on_text_motion(self, motion):
+        if self.prompt.active:
+            self.prompt.caret.on_text_motion(motion)
+            self.dirty = True
+
+    def on_text_motion_select(self, motion):
+        if self.prompt.active:
+            self.prompt.caret.on_text_motion_select(motion)
+            self.dirty = True
+
+    def add_line_to(self, position: str):
+        try:
+            items = [float(item) for item in position.replace(" ", "").split(",")]
+        except ValueError:
+            return
+        if len(items) in (2, 3):
+            x = round(items[0] / INCHES_PER_METER, 4)
+            y = round(items[1] / INCHES_PER_METER, 4)
+            self.simulation.line_to(x, y, math.radians(items[2]) if len(items) == 3 else None)
+            self.sync_robot()
+            self.invalidate()
+
+    def add_spline(self, position: str):
+        try:
+            items = [float(item) for item in position.replace(" ", "").split(",")]
+        except ValueError:
+            return
+        if len(items) == 3:
+            x = round(items[0] / INCHES_PER_METER, 4)
+            y = round(items[1] / INCHES_PER_METER, 4)
+            self.simulation.spline_to(x, y, math.radians(items[2]))
+            self.sync_robot()
+            self.invalidate()
+
+    def movement_index(self, row: int) -> int:
+        return int(self.trajectory.movements.listed()[row])
+
+    def edit_selection(self, symbol: int, modifiers: int):
+        row = self.console.selected
+        index = self.movement_index(row)
+        if symbol in (key.UP, key.DOWN):
+            target = row + (1 if symbol == key.DOWN else -1)
+            if modifiers & key.MOD_SHIFT:
+                if 0 <= target < len(self.console.lines):
+                    self.simulation.reorder(index, self.movement_index(target))
+                    self.console.select(target)
+            else:
+                self.console.select(target)
+
+        elif symbol in (key.DELETE, key.BACKSPACE):
+            self.simulation.delete(index)
+
+        elif symbol == key.F2:
+            self.open_prompt(
+                [f'Edit movement {row + 1}:'], functools.partial(self.edit_movement, index), [self.console.lines[row]]
+            )
+
+        elif symbol == key.INSERT:
+            self.open_prompt(
+                [f'Insert after movement {row + 1} (same words as the console):'],
+                functools.partial(self.insert_movement, index + 1)
+            )
+
+        elif symbol == key.ESCAPE:
+            self.console.select(None)
+
+    def edit_movement(self, index: int, text: str):
+        try:
+            action, direction, amount, arguments = parse(text)
+        except ValueError:
+            row = self.trajectory.movements.row(index)
+            self.open_prompt(
+                [f'Cannot read that, edit movement {row + 1}:'], functools.partial(self.edit_movement, index), [text]
+            )
+            return
+        self.simulation.modify(index, action, direction, amount, arguments)
+        self.simulation.checkpoint()
+        self.sync_robot()
+        self.invalidate()
+
+    def insert_movement(self, index: int, text: str):
+        try:
+            action, direction, amount, arguments = parse(text)
+        except ValueError:
+            row = self.trajectory.movements.row(index)
+            self.open_prompt(
+                [f'Cannot read that, insert after movement {row}:'], functools.partial(self.insert_movement, index),
+                [text]
+            )
+            return
+        self.simulation.insert(index, action, direction, amount, arguments)
+        self.sync_robot()
+        self.invalidate()
+
+    def save_routine(self, name: str):
+        if not name.strip():
+            return
+        try:
+            path = self.library.save(name.strip(), self.trajectory.start, self.trajectory.movements)
+        except (OSError, ValueError) as error:
+            self.open_prompt([f'Could not save ({error}), save as:'], self.save_routine, [name])
+            return
+        self.notice = f"Saved {path}"
+        self.update_label()
+
+    def load_routine(self, name: str):
+        if not name.strip():
+            return
+        try:
+            start, movements = self.library.load(name.strip())
+        except (OSError, ValueError, KeyError, struct.error) as error:
+            self.open_prompt([f'Could not load ({error}), open routine:'], self.load_routine, [name])
+            return
+        self.simulation.load(name.strip(), start, movements)
+        self.notice = f"Loaded {name.strip()}"
+        self.sync_robot()
+        self.invalidate()
+
+    def add_function(self, func_name: str, arguments: str):
+        if func_name:
+            self.simulation.function(func_name.replace(' ', ''), arguments)
+            self.invalidate()
 
-        return header + "\n\t".join(code) + "\ndrive.followTrajectorySequence(trajectory);"
+    def get_code(self):
+        return generate_code(
+            self.trajectory.start, self.trajectory.movements, self.settings['code_template'],
+            self.settings['compaction_tolerance'], self.settings['compaction_angle']
+        )
 
-    def get_text(self):
-        return [str(line) for line in self.movements if line.action != ActionType.VOID]
+    def copy_code(self):
+        # only Ctrl + P needs these, so they are not paid for at startup
+        import tkinter
+        import tkinter.messagebox
+        import pyperclip
+
+        code = "\n" + self.get_code() + "\n"
+        # numbered like the console rows, which skip separators
+        store = self.trajectory.movements
+        hits = self.field.check_path(store, self.trajectory.end_pose())
+        warning = "".join(f"Movement {store.row(index) + 1} hits {name}\n" for index, name in hits)
+        broken = violations(store, self.constraints)
+        warning += "".join(
+            f"Movement {store.row(index) + 1} goes over {', '.join(names)}\n" for index, names in sorted(broken.items())
+        )
+        if self.tk_root is None:
+            self.tk_root = tkinter.Tk()
+            self.tk_root.withdraw()
+            path = os.path.join(self.assets.source, 'icon.png')
+            self.tk_root.iconphoto(True, tkinter.PhotoImage(file=path))
+        if hits or broken:
+            tkinter.messagebox.showwarning('Code Copied, check the path!', warning + code, type=tkinter.messagebox.OK)
+        else:
+            tkinter.messagebox.showinfo('Code Copied!', code, type=tkinter.messagebox.OK)
+        print(warning + code)
+        pyperclip.copy(code)
 
     def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
-        if self.console_box.x <= x <= self.console_box.x + self.console_box.width:
-            self.console_box.y = min(max(self.console_box.y - scroll_y * self.settings['font_size'] * 1.5, 0),
-                                     self.console_box.height - self.field_size / 4)
+        if self.console.contains(x, y):
+            self.console.scroll(-scroll_y)
+            self.dirty = True
 
     def on_key_release(self, symbol, modifiers):
-        self.held_keys[symbol] = False
-
-        position = self.robot.position
-        angle = self.robot.rotation
-
-        if modifiers & key.MOD_SHIFT:
-            radians = math.radians(self.robot.rotation)
-            if symbol == key.Q:
-                new_angle = math.degrees(round((radians - (math.pi / 4)) / (math.pi / 4)) * (math.pi / 4))
-                self.add_movement(
-                    -math.radians(abs(angle - new_angle)),
-                    ActionType.ROTATION, Direction.VOID, (position, angle)
-                )
-                self.robot.rotation = new_angle
+        if self.prompt.active:
+            self.prompt.on_key_release(symbol)
+            self.dirty = True
+            return
+
+        # anything that changes the routine goes through the simulation so it can be recorded
+        handled = self.simulation.release(
+            key.symbol_string(symbol), bool(modifiers & key.MOD_SHIFT), bool(modifiers & key.MOD_ACCEL)
+        )
+        if symbol in (key.BRACKETLEFT, key.BRACKETRIGHT):
+            seconds = 1.0 if modifiers & key.MOD_SHIFT else 0.25
+            self.scrub(seconds if symbol == key.BRACKETRIGHT else -seconds)
 
-            elif symbol == key.E:
-                new_angle = math.degrees(round((radians + (math.pi / 4)) / (math.pi / 4)) * (math.pi / 4))
-                self.add_movement(
-                    math.radians(abs(angle - new_angle)),
-                    ActionType.ROTATION, Direction.VOID, (position, angle)
-                )
-                self.robot.rotation = new_angle
+        elif symbol == key.BACKSLASH:
+            self.close_timeline()
 
-            elif symbol == key.R:
-                self.add_movement(1, ActionType.SLEEP, Direction.VOID, (position, angle))
+        elif self.console.selected is not None and symbol in (
+            key.UP, key.DOWN, key.DELETE, key.BACKSPACE, key.F2, key.INSERT, key.ESCAPE
+        ):
+            self.edit_selection(symbol, modifiers)
 
-        else:
+        elif symbol == key.TAB and len(self.robots) > 1:
+            step = -1 if modifiers & key.MOD_SHIFT else 1
+            self.select_robot((self.active + step) % len(self.robots))
+
+        elif not handled and not modifiers & key.MOD_SHIFT:
             if symbol == key.P and modifiers & key.MOD_ACCEL:
-                code = "\n" + self.get_code() + "\n"
-                root = tkinter.Tk()
-                root.withdraw()
-                path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'resources', 'icon.png')
-                root.iconphoto(False, tkinter.PhotoImage(file=path))
-                tkinter.messagebox.showinfo('Code Copied!', code, type=tkinter.messagebox.OK)
-                print(code)
-                pyperclip.copy(code)
-
-            elif symbol == key.Z and modifiers & key.MOD_ACCEL:
-                if len(self.movements) > 0:
-                    movement = self.movements.pop(-1)
-                    self.robot.position, self.robot.rotation = movement.state
-                    self.update_console()
-
-            elif symbol == key.C and modifiers & key.MOD_ACCEL:
-                self.robot.rotation = 90
-                self.robot.x = self.center_x
-                self.robot.y = self.center_y
-                self.movements.clear()
-                self.setup = False
-                self.robot.opacity = 200
-                self.starting_position = self.center_x, self.center_y, 0
-                self.update_console()
-
-            elif symbol == key.SPACE:
-                self.movements.append(
-                    Movement(ActionType.VOID, Direction.VOID, 0, (self.robot.position, self.robot.rotation))
-                )
+                self.copy_code()
+
+            elif symbol == key.S and modifiers & key.MOD_ACCEL:
+                self.open_prompt(['Save routine as (name, .json for text):'], self.save_routine)
+
+            elif symbol == key.O and modifiers & key.MOD_ACCEL:
+                self.open_prompt([f"Open routine ({', '.join(self.library.names()[:8]) or 'none saved'}):"], self.load_routine)
 
-            elif symbol == key.T and self.setup:
-                read, write = Pipe()
-                process = Process(target=PositionDialog.run, args=(write,))
-                process.start()
-                process.join()
-                position = read.recv()
-                read.close()
-                write.close()
-                if position:
-                    items = position.replace(" ", "").split(",")
-                    x = round(float(items[0]) / 39.37, 4)
-                    y = round(float(items[1]) / 39.37, 4)
-                    rx = self.field_size / 2 + x * self.pixel_per_meter
-                    ry = self.field_size / 2 + y * self.pixel_per_meter
-                    r = None
-                    if len(items) == 3:
-                        r = math.radians(float(items[2]))
-
-                    self.robot.position = rx, ry
-                    self.add_movement(
-                        (x, y, r) if r is not None else (x, y),
-                        ActionType.MOVEMENT, Direction.POSITIONAL,
-                        (self.robot.position, self.robot.rotation)
-                    )
-                    if len(items) == 3:
-                        self.robot.rotation = (-float(items[2])) + 90
+            elif symbol == key.T and self.trajectory.setup:
+                self.open_prompt(['Position to travel to (x, y, rotation [optional]):'], self.add_line_to)
+
+            elif symbol == key.V and self.trajectory.setup:
+                self.open_prompt(['Spline to (x, y, end tangent):'], self.add_spline)
 
             elif symbol == key.M:
                 if self.mouse_pos_mode:
                     self.mouse_pos_mode = False
                     self.position_label.color = (0, 100, 0, 255)
+                    self.snapped = None
+                    self.snap_marker.visible = False
                 else:
                     self.mouse_pos_mode = True
                     self.position_label.color = (100, 0, 100, 255)
+                    self.snap()
+
+            elif symbol == key.L:
+                self.open_prompt(
+                    ['Telemetry log to overlay (CSV of time, x, y, heading, empty to hide):'], self.open_log
+                )
 
-            elif symbol == key.ENTER:
-                self.setup = True
-                self.robot.opacity = 255
-                self.starting_position = self.robot.x, self.robot.y, self.robot.rotation
-
-            elif symbol == key.R:
-                self.add_movement(.1, ActionType.SLEEP, Direction.VOID, (position, angle))
-
-            elif symbol == key.F and self.setup:
-                read, write = Pipe()
-                process = Process(target=FunctionDialog.run, args=(write,))
-                process.start()
-                process.join()
-                func_name, arguments = tuple(read.recv().split(chr(23)))
-                read.close()
-                write.close()
-                if func_name:
-                    self.add_movement(
-                        func_name.replace(' ', ''),
-                        ActionType.FUNCTION, Direction.VOID,
-                        (self.robot.position, self.robot.rotation),
-                        arguments
-                    )
-
-            elif symbol == key.C:
+            elif symbol == key.F and self.trajectory.setup:
+                self.open_prompt(
+                    ['Enter the name of the function to add:', 'Arguments, separated by commas'],
+                    self.add_function
+                )
+
+            elif symbol == key.C and not modifiers & key.MOD_ACCEL:
                 self.mode += 1
                 if self.mode > 2:
                     self.mode = 0
 
-    def update_console(self):
-        lines = self.get_text()
-        self.console.delete_text(0, len(self.console.text))
-        text = ""
-        for line in lines:
-            index = lines.index(line)
-            text += f"{index + 1}: {line}\n"
-        self.console.insert_text(0, text, dict(
-            color=(255, 255, 255, 255), font_size=self.settings['font_size']
-        ))
-
-    def line_to(self, length: float, angle: float, width: float, color: tuple) -> pyglet.shapes.Line:
+            elif symbol == key.F3:
+                self.hud.visible = not self.hud.visible
+                if self.hud.visible:
+                    self.start_profiling()
+                    self.update_hud()
+                else:
+                    self.stop_profiling()
+
+        self.sync_robot()
+        self.invalidate()
+
+    def line_to(self, length: float, angle: float) -> tuple:
         total_angle = self.robot.rotation + angle
         pixel_length = length * self.pixel_per_meter
         x1, x2 = self.robot.x, self.robot.x + pixel_length * math.sin(math.radians(total_angle))
         y1, y2 = self.robot.y, self.robot.y + pixel_length * math.cos(math.radians(total_angle))
-        return pyglet.shapes.Line(x1, y1, x2, y2, width, color)
+        return x1, y1, x2, y2
+
+
+class EventLoop(pyglet.app.EventLoop):
+    def idle(self):
+        dt = self.clock.update_time()
+        self.clock.call_scheduled_functions(dt)
+
+        # only redraw windows whose state changed, no faster than their frame cap
+        timeout = self.clock.get_sleep_time(True)
+        for window in pyglet.app.windows:
+            remaining = window.redraw()
+            if remaining is not None:
+                timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Draw autonomous routines by driving the robot around the field.')
+    parser.add_argument('--record', help='record every input to this file, replay it with simulation.py')
+    parser.add_argument('--profile', help='time the hot paths and write the stats to this CSV file on exit')
+    args = parser.parse_args()
+
     display = pyglet.canvas.Display().get_default_screen()
     x_mult, y_mult = display.width / 16, display.height / 9
     mult = round(min(x_mult, y_mult) * 0.75)
-    app = Application(16 * mult, 9 * mult)
-
-    # start the event loop and render loop
-    pyglet.clock.schedule(app.on_render)
-    pyglet.clock.schedule(app.on_update)
+    app = Application(16 * mult, 9 * mult, args.record, args.profile is not None)
+    app.schedule()
+    pyglet.app.event_loop = EventLoop()
     pyglet.app.run()
+    app.simulation.close()
+    if args.profile:
+        app.profiler.dump_csv(args.profile)
@@ -0,0 +1,137 @@
+import math
+
+import numpy as np
+
+from spline import measure
+from trajectory import INCHES_PER_METER, ActionType, Direction, MovementStore
+
+
+class Constraints:
+    __slots__ = (
+        'max_velocity', 'max_acceleration', 'max_angular_velocity', 'max_angular_acceleration', 'max_jerk',
+        'max_centripetal_acceleration', 'track_width', 'lateral_multiplier'
+    )
+
+    def __init__(self, max_velocity: float, max_acceleration: float, max_angular_velocity: float,
+                 max_angular_acceleration: float, max_jerk: float = 0.0, max_centripetal_acceleration: float = None,
+                 track_width: float = 0.0, lateral_multiplier: float = 1.0):
+        self.max_velocity = max_velocity
+        self.max_acceleration = max_acceleration
+        self.max_angular_velocity = max_angular_velocity
+        self.max_angular_acceleration = max_angular_acceleration
+        self.max_jerk = max_jerk
+        self.max_centripetal_acceleration = max_centripetal_acceleration or max_acceleration
+        self.track_width = track_width
+        self.lateral_multiplier = lateral_multiplier
+
+    @classmethod
+    def from_settings(cls, settings: dict):
+        # config.json uses inches and degrees like the rest of the file
+        return cls(
+            settings['max_velocity'] / INCHES_PER_METER,
+            settings['max_acceleration'] / INCHES_PER_METER,
+            math.radians(settings['max_angular_velocity']),
+            math.radians(settings['max_angular_acceleration']),
+            settings['max_jerk'] / INCHES_PER_METER,
+            settings['max_centripetal_acceleration'] / INCHES_PER_METER,
+            settings['track_width'] / INCHES_PER_METER,
+            settings['lateral_multiplier']
+        )
+
+
+def normalize_angle(angle):
+    return (np.asarray(angle) + math.pi) % (2 * math.pi) - math.pi
+
+
+def segment_distances(store: MovementStore, rows: slice = slice(None)) -> tuple:
+    count = len(store)
+    if count == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+
+    # views onto the store's arrays, none is kept so the store can still grow
+    actions = np.frombuffer(store.actions, dtype=np.int8)[rows]
+    directions = np.frombuffer(store.directions, dtype=np.int8)[rows]
+    amounts = np.frombuffer(store.amounts, dtype=np.float64).reshape(count, 3)[rows]
+    poses = np.frombuffer(store.poses, dtype=np.float64).reshape(count, 3)[rows]
+
+    movement = actions == ActionType.MOVEMENT.value
+    positional = movement & (directions == Direction.POSITIONAL.value)
+    linear = np.where(movement & ~positional, np.abs(amounts[:, 0]), 0.0)
+    linear = np.where(positional, np.hypot(amounts[:, 0] - poses[:, 0], amounts[:, 1] - poses[:, 1]), linear)
+
+    angular = np.where(actions == ActionType.ROTATION.value, np.abs(amounts[:, 0]), 0.0)
+    heading = positional & ~np.isnan(amounts[:, 2])
+    angular = np.where(heading, np.abs(normalize_angle(amounts[:, 2] - poses[:, 2])), angular)
+
+    spline = actions == ActionType.SPLINE.value
+    if spline.any():
+        linear[spline], angular[spline] = measure(poses[spline], amounts[spline])
+
+    sleep = np.where(actions == ActionType.SLEEP.value, amounts[:, 0], 0.0)
+    return linear, angular, sleep
+
+
+def peak_velocity(distance: np.ndarray, max_velocity: float, max_acceleration: float, max_jerk: float = 0.0):
+    if max_jerk > 0:
+        # S-curve: the acceleration ramps in and out at max_jerk
+        a, j = max_acceleration, max_jerk
+        limited = (-a * a / j + np.sqrt((a * a / j) ** 2 + 4 * a * distance)) / 2
+        short = (distance * math.sqrt(j) / 2) ** (2 / 3)
+        return np.minimum(np.where(limited >= a * a / j, limited, short), max_velocity)
+    return np.minimum(np.sqrt(distance * max_acceleration), max_velocity)
+
+
+def ramp_time(peak: np.ndarray, max_acceleration: float, max_jerk: float = 0.0):
+    if max_jerk > 0:
+        a, j = max_acceleration, max_jerk
+        return np.where(peak >= a * a / j, peak / a + a / j, 2 * np.sqrt(peak / j))
+    return peak / max_acceleration
+
+
+def profile_time(distance, max_velocity: float, max_acceleration: float, max_jerk: float = 0.0) -> np.ndarray:
+    distance = np.asarray(distance, dtype=np.float64)
+    peak = peak_velocity(distance, max_velocity, max_acceleration, max_jerk)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(distance > 0, distance / peak + ramp_time(peak, max_acceleration, max_jerk), 0.0)
+
+
+def segment_times(linear: np.ndarray, angular: np.ndarray, sleep: np.ndarray, constraints: Constraints) -> np.ndarray:
+    # line to linear heading turns while it drives, so the slower of the two profiles wins
+    return np.maximum(
+        profile_time(linear, constraints.max_velocity, constraints.max_acceleration, constraints.max_jerk),
+        profile_time(angular, constraints.max_angular_velocity, constraints.max_angular_acceleration)
+    ) + sleep
+
+
+def estimate(store: MovementStore, constraints: Constraints, rows: slice = slice(None)) -> tuple:
+    times = segment_times(*segment_distances(store, rows), constraints)
+    return times, float(times.sum())
+
+
+def estimate_many(stores: list, constraints: Constraints) -> np.ndarray:
+    distances = [segment_distances(store) for store in stores]
+    counts = np.array([len(linear) for linear, _, _ in distances], dtype=np.intp)
+    if len(stores) == 0:
+        return np.zeros(0)
+    times = segment_times(*(np.concatenate(column) for column in zip(*distances)), constraints)
+    cumulative = np.concatenate(([0.0], np.cumsum(times)))
+    ends = np.cumsum(counts)
+    return cumulative[ends] - cumulative[ends - counts]
+
+
+def sample(distance, t, max_velocity: float, max_acceleration: float) -> tuple:
+    distance = np.asarray(distance, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    peak = peak_velocity(distance, max_velocity, max_acceleration)
+    ramp = peak / max_acceleration
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total = np.where(distance > 0, distance / peak + ramp, 0.0)
+    t = np.clip(t, 0, total)
+    remaining = total - t
+    velocity = np.clip(np.minimum(peak, max_acceleration * np.minimum(t, remaining)), 0, None)
+    position = np.where(
+        t < ramp,
+        max_acceleration * t * t / 2,
+        np.where(remaining < ramp, distance - max_acceleration * remaining * remaining / 2, peak * (t - ramp / 2))
+    )
+    return np.clip(position, 0, distance), velocity
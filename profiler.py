@@ -0,0 +1,63 @@
+import csv
+import functools
+import math
+import time
+from collections import deque
+
+
+class Profiler:
+    def __init__(self, size: int = 2000, enabled: bool = False):
+        self.size = size
+        self.enabled = enabled
+        self.samples = {}
+        self.totals = {}
+
+    def record(self, name: str, seconds: float):
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.size)
+            self.totals[name] = [0, 0.0]
+        self.samples[name].append(seconds)
+        total = self.totals[name]
+        total[0] += 1
+        total[1] += seconds
+
+    def wrap(self, function, name: str = None):
+        name = name or function.__name__
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            if not self.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def percentile(self, name: str, q: float) -> float:
+        samples = sorted(self.samples.get(name, ()))
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, max(0, math.ceil(q / 100 * len(samples)) - 1))]
+
+    def summary(self) -> list:
+        rows = []
+        for name, samples in self.samples.items():
+            calls, total = self.totals[name]
+            rows.append((
+                name, calls, total / calls,
+                self.percentile(name, 50), self.percentile(name, 99), max(samples)
+            ))
+        return rows
+
+    def dump_csv(self, path: str):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['section', 'calls', 'mean_ms', 'p50_ms', 'p99_ms', 'max_ms'])
+            for name, calls, *times in self.summary():
+                writer.writerow([name, calls, *(f"{value * 1000:.4f}" for value in times)])
+
+    def clear(self):
+        self.samples.clear()
+        self.totals.clear()
@@ -0,0 +1,298 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import config
+from storage import Library
+from templates import generate_code
+from trajectory import INCHES_PER_METER, ActionType, Direction, Trajectory
+
+
+class Recorder:
+    def __init__(self, path: str):
+        self.file = open(path, 'w')
+        self.start = time.perf_counter()
+
+    def write(self, tick: int, event: str, **data):
+        data.update(tick=tick, time=round(time.perf_counter() - self.start, 6), event=event)
+        self.file.write(json.dumps(data) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class Simulation:
+    def __init__(self, trajectory: Trajectory, speed: float, rotation_speed: float, update_rate: int,
+                 recorder: Recorder = None):
+        self.trajectory = trajectory
+        self.trajectories = {0: trajectory}
+        self.speed = speed
+        self.rotation_speed = rotation_speed
+        self.timestep = 1 / update_rate
+        self.held = set()
+        self.tick = 0
+        self.accumulator = 0.0
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.write(
+                0, 'header', speed=speed, rotation_speed=rotation_speed, update_rate=update_rate,
+                start=list(trajectory.origin)
+            )
+
+    def record(self, event: str, **data):
+        if self.recorder is not None:
+            self.recorder.write(self.tick, event, **data)
+
+    def update(self, dt: float) -> int:
+        # the routine only ever advances in whole fixed steps, whatever the frame rate is
+        self.accumulator += dt
+        steps = 0
+        while self.accumulator >= self.timestep:
+            self.accumulator -= self.timestep
+            self.step()
+            steps += 1
+        return steps
+
+    def step(self):
+        self.tick += 1
+        distance = self.speed * self.timestep
+        rotation = math.radians(self.rotation_speed * self.timestep)
+
+        turning = False
+        if 'LSHIFT' in self.held or 'RSHIFT' in self.held:
+            distance *= 0.25
+        else:
+            if 'Q' in self.held:
+                self.trajectory.turn(-rotation)
+                turning = True
+
+            elif 'E' in self.held:
+                self.trajectory.turn(rotation)
+                turning = True
+
+        if not turning:
+            if 'W' in self.held:
+                self.trajectory.move(Direction.VERTICAL, distance)
+
+            elif 'S' in self.held:
+                self.trajectory.move(Direction.VERTICAL, -distance)
+
+            elif 'A' in self.held:
+                self.trajectory.move(Direction.HORIZONTAL, -distance)
+
+            elif 'D' in self.held:
+                self.trajectory.move(Direction.HORIZONTAL, distance)
+
+    def press(self, name: str, shift: bool = False, accel: bool = False):
+        self.record('press', key=name, shift=shift, accel=accel)
+        self.trajectory.checkpoint()
+        if not accel:
+            self.held.add(name)
+
+    def release(self, name: str, shift: bool = False, accel: bool = False) -> bool:
+        self.record('release', key=name, shift=shift, accel=accel)
+        self.held.discard(name)
+        self.trajectory.checkpoint()
+
+        if shift:
+            angle = -math.degrees(self.trajectory.pose[2]) + 90
+            radians = math.radians(angle)
+            if name == 'Z' and accel:
+                self.trajectory.redo()
+
+            elif name == 'Q':
+                new_angle = math.degrees(round((radians - (math.pi / 4)) / (math.pi / 4)) * (math.pi / 4))
+                self.trajectory.turn(-math.radians(abs(angle - new_angle)))
+
+            elif name == 'E':
+                new_angle = math.degrees(round((radians + (math.pi / 4)) / (math.pi / 4)) * (math.pi / 4))
+                self.trajectory.turn(math.radians(abs(angle - new_angle)))
+
+            elif name == 'R':
+                self.trajectory.sleep(1)
+
+            else:
+                return False
+
+        elif accel:
+            if name == 'Z':
+                self.trajectory.undo()
+
+            elif name == 'Y':
+                self.trajectory.redo()
+
+            elif name == 'C':
+                self.trajectory.reset()
+
+            else:
+                return False
+
+        elif name == 'SPACE':
+            self.trajectory.separate()
+
+        elif name == 'ENTER':
+            self.trajectory.begin()
+
+        elif name == 'R':
+            self.trajectory.sleep(.1)
+
+        else:
+            return False
+        return True
+
+    def release_all(self):
+        self.record('release_all')
+        self.held.clear()
+        self.trajectory.checkpoint()
+
+    def select(self, index: int, speed: float, rotation_speed: float, start: tuple):
+        self.record('select', index=index, speed=speed, rotation_speed=rotation_speed, start=list(start))
+        self.held.clear()
+        if index not in self.trajectories:
+            self.trajectories[index] = Trajectory(tuple(start))
+        self.trajectory = self.trajectories[index]
+        self.speed = speed
+        self.rotation_speed = rotation_speed
+
+    def retime(self, update_rate: int):
+        self.record('retime', update_rate=update_rate)
+        self.timestep = 1 / update_rate
+
+    def line_to(self, x: float, y: float, heading: float = None):
+        self.record('line_to', x=x, y=y, heading=heading)
+        self.trajectory.line_to(x, y, heading)
+
+    def spline_to(self, x: float, y: float, tangent: float):
+        self.record('spline_to', x=x, y=y, tangent=tangent)
+        self.trajectory.spline_to(x, y, tangent)
+
+    def edit_spline(self, index: int, x: float, y: float, tangent: float):
+        self.record('edit_spline', index=index, x=x, y=y, tangent=tangent)
+        self.trajectory.edit_spline(index, x, y, tangent)
+
+    def insert(self, index: int, action: ActionType, direction: Direction, amount: any, arguments: str = ''):
+        self.record('insert', index=index, action=action.name, direction=direction.name, amount=amount,
+                    arguments=arguments)
+        self.trajectory.insert(index, action, direction, amount, arguments)
+
+    def delete(self, index: int):
+        self.record('delete', index=index)
+        self.trajectory.delete(index)
+
+    def modify(self, index: int, action: ActionType, direction: Direction, amount: any, arguments: str = ''):
+        self.record('modify', index=index, action=action.name, direction=direction.name, amount=amount,
+                    arguments=arguments)
+        self.trajectory.modify(index, action, direction, amount, arguments)
+
+    def reorder(self, index: int, target: int):
+        self.record('reorder', index=index, target=target)
+        self.trajectory.reorder(index, target)
+
+    def checkpoint(self):
+        self.record('checkpoint')
+        self.trajectory.checkpoint()
+
+    def function(self, name: str, arguments: str = ''):
+        self.record('function', name=name, arguments=arguments)
+        self.trajectory.function(name, arguments)
+
+    def load(self, name: str, start: tuple, movements):
+        self.record('load', name=name)
+        self.trajectory.load(start, movements)
+
+    def close(self):
+        self.record('end')
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+def replay(path: str, library: Library = None) -> Simulation:
+    simulation = None
+    with open(path, 'r') as file:
+        for line in file:
+            event = json.loads(line)
+            if simulation is None and event['event'] != 'header':
+                raise ValueError(f"{path} does not start with a session header")
+            if event['event'] == 'header':
+                simulation = Simulation(
+                    Trajectory(tuple(event.get('start', (0.0, 0.0, 0.0)))),
+                    event['speed'], event['rotation_speed'], event['update_rate']
+                )
+                continue
+
+            while simulation.tick < event['tick']:
+                simulation.step()
+
+            if event['event'] == 'press':
+                simulation.press(event['key'], event['shift'], event['accel'])
+            elif event['event'] == 'release':
+                simulation.release(event['key'], event['shift'], event['accel'])
+            elif event['event'] == 'release_all':
+                simulation.release_all()
+            elif event['event'] == 'line_to':
+                simulation.line_to(event['x'], event['y'], event['heading'])
+            elif event['event'] == 'spline_to':
+                simulation.spline_to(event['x'], event['y'], event['tangent'])
+            elif event['event'] == 'edit_spline':
+                simulation.edit_spline(event['index'], event['x'], event['y'], event['tangent'])
+            elif event['event'] in ('insert', 'modify'):
+                amount = event['amount']
+                getattr(simulation, event['event'])(
+                    event['index'], ActionType[event['action']], Direction[event['direction']],
+                    tuple(amount) if isinstance(amount, list) else amount, event['arguments']
+                )
+            elif event['event'] == 'delete':
+                simulation.delete(event['index'])
+            elif event['event'] == 'reorder':
+                simulation.reorder(event['index'], event['target'])
+            elif event['event'] == 'checkpoint':
+                simulation.checkpoint()
+            elif event['event'] == 'function':
+                simulation.function(event['name'], event['arguments'])
+            elif event['event'] == 'select':
+                simulation.select(event['index'], event['speed'], event['rotation_speed'], event['start'])
+            elif event['event'] == 'retime':
+                simulation.retime(event['update_rate'])
+            elif event['event'] == 'load':
+                if library is None:
+                    raise ValueError(f"{path} loads the routine {event['name']}, pass the routine directory")
+                simulation.load(event['name'], *library.load(event['name']))
+    return simulation
+
+
+if __name__ == '__main__':
+    settings, _ = config.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json'))
+    settings = settings or config.DEFAULTS
+    parser = argparse.ArgumentParser(description='Replay a recorded session without a window.')
+    parser.add_argument('session', help='session file written with main.py --record')
+    parser.add_argument('--output', help='write the generated code here instead of printing it')
+    parser.add_argument('--routines', default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), settings['routine_directory']
+    ), help='directory routines opened during the session are loaded from')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = replay(args.session, Library(args.routines))
+    elapsed = time.perf_counter() - start
+
+    code = "\n\n".join(
+        generate_code(
+            trajectory.start, trajectory.movements, settings['code_template'],
+            settings['compaction_tolerance'], settings['compaction_angle']
+        )
+        for _, trajectory in sorted(result.trajectories.items())
+    )
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(code + '\n')
+    else:
+        print(code)
+    x, y, heading = result.trajectory.pose
+    print(
+        f"Replayed {result.tick} steps ({result.tick * result.timestep:.2f}s) in {elapsed:.3f}s, "
+        f"final pose {round(x * INCHES_PER_METER, 4), round(y * INCHES_PER_METER, 4), round(heading, 4)}",
+        file=sys.stderr
+    )
@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+
+from trajectory import Direction, MovementStore
+
+GRID = 'grid'
+WAYPOINT = 'waypoint'
+
+
+def tidy(value: float, digits: int = 4) -> float:
+    # rounding a tiny negative leaves -0.0, adding 0.0 drops the sign
+    return round(value, digits) + 0.0
+
+
+def obstacle_points(obstacle) -> list:
+    cos, sin = math.cos(obstacle.angle), math.sin(obstacle.angle)
+    points = []
+    for along in (-1, 0, 1):
+        for across in (-1, 0, 1):
+            dx, dy = along * obstacle.length / 2, across * obstacle.width / 2
+            points.append((obstacle.x + dx * cos - dy * sin, obstacle.y + dx * sin + dy * cos))
+    return points
+
+
+def waypoints(store: MovementStore) -> tuple:
+    count = len(store)
+    rows = np.flatnonzero(np.frombuffer(store.directions, dtype=np.int8) == Direction.POSITIONAL.value)
+    amounts = np.frombuffer(store.amounts, dtype=np.float64).reshape(count, 3)
+    return rows, amounts[rows, :2]
+
+
+class SnapIndex:
+    def __init__(self, radius: float, tile: float, half: float, obstacles: list = (), store: MovementStore = None):
+        # cells as wide as the snap radius, so a lookup only reads the 3 x 3 around the pointer
+        self.radius = radius
+        steps = np.arange(-half, half + tile / 4, tile / 2)
+        grid_x, grid_y = (column.reshape(-1) for column in np.meshgrid(steps, steps))
+        names = [GRID] * len(grid_x)
+        points = [np.column_stack((grid_x, grid_y))]
+        for obstacle in obstacles:
+            points.append(np.array(obstacle_points(obstacle)).reshape(-1, 2))
+            names += [obstacle.name] * len(points[-1])
+        rows = [np.full(len(names), -1, dtype=np.intp)]
+        if store is not None and len(store) > 0:
+            waypoint_rows, targets = waypoints(store)
+            points.append(targets)
+            rows.append(waypoint_rows)
+            names += [WAYPOINT] * len(targets)
+        points = np.concatenate(points)
+        self.points = points.tolist()
+        self.rows = np.concatenate(rows).tolist()
+        self.names = names
+
+        self.cells = {}
+        for index, (i, j) in enumerate(np.floor(points / radius).astype(np.int64).tolist()):
+            self.cells.setdefault((i, j), []).append(index)
+
+    def __len__(self):
+        return len(self.points)
+
+    def cell(self, value: float) -> int:
+        return math.floor(value / self.radius)
+
+    def candidates(self, x: float, y: float):
+        i, j = self.cell(x), self.cell(y)
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                yield from self.cells.get((i + di, j + dj), ())
+
+    def nearest(self, x: float, y: float, exclude: int = None, waypoint: bool = False) -> int:
+        # obstacles and waypoints win over the grid
+        best = None
+        best_key = None
+        for index in self.candidates(x, y):
+            row = self.rows[index]
+            if (exclude is not None and row == exclude) or (waypoint and row < 0):
+                continue
+            px, py = self.points[index]
+            distance = math.hypot(px - x, py - y)
+            if distance > self.radius:
+                continue
+            key = (self.names[index] == GRID, distance)
+            if best_key is None or key < best_key:
+                best, best_key = index, key
+        return best
+
+    def snap(self, x: float, y: float, exclude: int = None) -> tuple:
+        index = self.nearest(x, y, exclude)
+        if index is None:
+            return x, y, None
+        px, py = self.points[index]
+        return px, py, self.names[index]
+
+    def waypoint(self, x: float, y: float) -> int:
+        index = self.nearest(x, y, waypoint=True)
+        return None if index is None else self.rows[index]
@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+
+from trajectory import ActionType, MovementStore
+
+SAMPLES = 32
+
+
+def hermite(starts, targets, t) -> np.ndarray:
+    # like Road Runner: tangents as long as the chord, no second derivative at the ends
+    starts = np.asarray(starts, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    shape = (-1,) + (1,) * (t.ndim - 1)
+    x0, y0, h0 = (starts[:, column].reshape(shape) for column in range(3))
+    x1, y1, h1 = (targets[:, column].reshape(shape) for column in range(3))
+    chord = np.hypot(x1 - x0, y1 - y0)
+
+    t2 = t * t
+    t3 = t2 * t
+    t4 = t3 * t
+    t5 = t4 * t
+    start = 1 - 10 * t3 + 15 * t4 - 6 * t5
+    start_tangent = t - 6 * t3 + 8 * t4 - 3 * t5
+    end_tangent = -4 * t3 + 7 * t4 - 3 * t5
+    end = 10 * t3 - 15 * t4 + 6 * t5
+    x = start * x0 + end * x1 + chord * (start_tangent * np.cos(h0) + end_tangent * np.cos(h1))
+    y = start * y0 + end * y1 + chord * (start_tangent * np.sin(h0) + end_tangent * np.sin(h1))
+
+    d_end = 30 * t2 - 60 * t3 + 30 * t4
+    d_start_tangent = 1 - 18 * t2 + 32 * t3 - 15 * t4
+    d_end_tangent = -12 * t2 + 28 * t3 - 15 * t4
+    dx = d_end * (x1 - x0) + chord * (d_start_tangent * np.cos(h0) + d_end_tangent * np.cos(h1))
+    dy = d_end * (y1 - y0) + chord * (d_start_tangent * np.sin(h0) + d_end_tangent * np.sin(h1))
+    turn = (h1 - h0 + math.pi) % (2 * math.pi) - math.pi
+    heading = np.where(chord > 0, np.arctan2(dy, dx), h0 + turn * t)
+    return np.stack(np.broadcast_arrays(x, y, heading), axis=-1)
+
+
+def sample(starts, targets, samples: int = SAMPLES) -> np.ndarray:
+    count = len(starts)
+    return hermite(starts, targets, np.broadcast_to(np.linspace(0, 1, samples + 1), (count, samples + 1)))
+
+
+def measure(starts, targets, samples: int = SAMPLES) -> tuple:
+    points = sample(starts, targets, samples)
+    step = np.diff(points, axis=1)
+    length = np.hypot(step[..., 0], step[..., 1]).sum(axis=1)
+    turning = np.abs((step[..., 2] + math.pi) % (2 * math.pi) - math.pi).sum(axis=1)
+    return length, turning
+
+
+def spline_rows(store: MovementStore) -> tuple:
+    count = len(store)
+    actions = np.frombuffer(store.actions, dtype=np.int8)
+    rows = np.flatnonzero(actions == ActionType.SPLINE.value)
+    poses = np.frombuffer(store.poses, dtype=np.float64).reshape(count, 3)
+    amounts = np.frombuffer(store.amounts, dtype=np.float64).reshape(count, 3)
+    return rows, poses[rows], amounts[rows]
+
+
+class SplineCache:
+    def __init__(self, samples: int = SAMPLES):
+        self.samples = samples
+        self.rows = np.zeros(0, dtype=np.intp)
+        self.keys = np.zeros((0, 6))
+        self.points = np.zeros((0, samples + 1, 3))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def update(self, store: MovementStore) -> np.ndarray:
+        # a spline whose row, start and target are unchanged keeps its samples
+        rows, starts, targets = spline_rows(store)
+        keys = np.hstack((starts, targets))
+        kept = min(len(rows), len(self.rows))
+        same = np.zeros(len(rows), dtype=bool)
+        same[:kept] = (rows[:kept] == self.rows[:kept]) & np.all(keys[:kept] == self.keys[:kept], axis=1)
+        stale = np.flatnonzero(~same)
+
+        if len(rows) != len(self.rows):
+            points = np.empty((len(rows), self.samples + 1, 3))
+            points[:kept] = self.points[:kept]
+            self.points = points
+        if len(stale):
+            self.points[stale] = sample(starts[stale], targets[stale], self.samples)
+        self.rows, self.keys = rows, keys
+        return stale
+
+    def targets(self) -> np.ndarray:
+        return self.keys[:, 3:]
@@ -0,0 +1,217 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from trajectory import ActionType, Direction, MovementStore, advance
+
+MAGIC = b'RGUI'
+VERSION = 1
+BINARY_EXTENSION = '.traj'
+JSON_EXTENSION = '.json'
+
+# magic, version, reserved, movement count, start pose, then the store's columns 8-byte aligned
+HEADER = struct.Struct('<4sHHI3d')
+LABEL = struct.Struct('<III')
+
+
+def align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def layout(count: int) -> tuple:
+    actions = align(HEADER.size)
+    directions = actions + count
+    amounts = align(directions + count)
+    poses = amounts + count * 24
+    labels = poses + count * 24
+    return actions, directions, amounts, poses, labels
+
+
+def little_endian(column: array) -> bytes:
+    if sys.byteorder == 'big' and column.itemsize > 1:
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def save_binary(path: str, start: tuple, movements: MovementStore):
+    count = len(movements)
+    labels = [(index, label) for index, label in enumerate(movements.labels) if label is not None]
+    offsets = layout(count)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, 0, count, *start))
+        for offset, column in zip(offsets, (movements.actions, movements.directions, movements.amounts, movements.poses)):
+            file.write(b'\0' * (offset - file.tell()))
+            file.write(little_endian(column))
+        file.write(struct.pack('<I', len(labels)))
+        encoded = [(index, name.encode(), arguments.encode()) for index, (name, arguments) in labels]
+        for index, name, arguments in encoded:
+            file.write(LABEL.pack(index, len(name), len(arguments)))
+        for _, name, arguments in encoded:
+            file.write(name + arguments)
+
+
+def save_json(path: str, start: tuple, movements: MovementStore):
+    rows = []
+    for movement in movements:
+        row = dict(action=movement.action.name, direction=movement.direction.name)
+        if movement.action == ActionType.FUNCTION:
+            row.update(name=movement.amount, arguments=movement.arguments)
+        elif movement.direction == Direction.POSITIONAL:
+            row.update(amount=list(movement.amount))
+        elif movement.action != ActionType.VOID:
+            row.update(amount=movement.amount)
+        rows.append(row)
+    with open(path, 'w') as file:
+        json.dump(dict(version=VERSION, start=list(start), movements=rows), file, indent=2)
+
+
+def load_json(path: str) -> tuple:
+    with open(path, 'r') as file:
+        data = json.load(file)
+    start = tuple(data['start'])
+    movements = MovementStore()
+    pose = start
+    for row in data['movements']:
+        action = ActionType[row['action']]
+        direction = Direction[row['direction']]
+        if action == ActionType.FUNCTION:
+            amount = row['name']
+        elif direction == Direction.POSITIONAL:
+            amount = tuple(row['amount'])
+        else:
+            amount = row.get('amount', 0)
+        movements.append(action, direction, amount, pose, row.get('arguments', ''))
+        pose = advance(pose, action, direction, amount)
+    return start, movements
+
+
+class Routine:
+    def __init__(self, path: str):
+        self.path = path
+        self.binary = path.endswith(BINARY_EXTENSION)
+        self.map = None
+        self._header = None
+
+    @property
+    def name(self) -> str:
+        return os.path.splitext(os.path.basename(self.path))[0]
+
+    @property
+    def header(self) -> tuple:
+        if self._header is None:
+            if self.binary:
+                with open(self.path, 'rb') as file:
+                    magic, version, _, count, *start = HEADER.unpack(file.read(HEADER.size))
+                if magic != MAGIC or version > VERSION:
+                    raise ValueError(f"{self.path} is not a routine file")
+                self._header = count, tuple(start)
+            else:
+                start, movements = load_json(self.path)
+                self._header = len(movements), start
+        return self._header
+
+    def columns(self) -> tuple:
+        count, _ = self.header
+        if self.map is None:
+            with open(self.path, 'rb') as file:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self.map)
+        actions, directions, amounts, poses, labels = layout(count)
+        columns = data[actions:directions], data[directions:directions + count], data[amounts:poses], data[poses:labels]
+
+        names = [None] * count
+        label_count, = struct.unpack_from('<I', self.map, labels)
+        offset = labels + 4
+        text = offset + label_count * LABEL.size
+        for _ in range(label_count):
+            index, name, arguments = LABEL.unpack_from(self.map, offset)
+            offset += LABEL.size
+            if index >= count:
+                raise ValueError(f"{self.path} labels movement {index} of {count}")
+            names[index] = (
+                str(data[text:text + name], 'utf-8'),
+                str(data[text + name:text + name + arguments], 'utf-8')
+            )
+            text += name + arguments
+        return columns, names
+
+    def load(self) -> tuple:
+        if not self.binary:
+            return load_json(self.path)
+        _, start = self.header
+        columns, labels = self.columns()
+        movements = MovementStore()
+        for name, column in zip(('actions', 'directions', 'amounts', 'poses'), columns):
+            getattr(movements, name).frombytes(column)
+            if sys.byteorder == 'big':
+                getattr(movements, name).byteswap()
+        movements.labels = labels
+        return start, movements
+
+    def close(self):
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # a view is still alive, the mapping goes away with it
+                pass
+            self.map = None
+
+
+class Library:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.routines = {}
+
+    def path(self, name: str) -> str:
+        if os.sep in name or (os.altsep and os.altsep in name):
+            raise ValueError(f"{name} is not a routine name, it cannot contain a path separator")
+        if not os.path.splitext(name)[1]:
+            name += BINARY_EXTENSION
+        return os.path.join(self.directory, name)
+
+    def names(self) -> list:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            entry.name for entry in os.scandir(self.directory)
+            if entry.name.endswith((BINARY_EXTENSION, JSON_EXTENSION))
+        )
+
+    def __getitem__(self, name: str) -> Routine:
+        path = self.path(name)
+        if path not in self.routines:
+            self.routines[path] = Routine(path)
+        return self.routines[path]
+
+    def __iter__(self):
+        for name in self.names():
+            yield self[name]
+
+    def save(self, name: str, start: tuple, movements: MovementStore) -> str:
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        routine = self.routines.pop(path, None)
+        if routine is not None:
+            routine.close()
+
+        # write next to the file and swap it in, so open mappings of the old routine stay valid
+        temporary = path + '.tmp'
+        if path.endswith(JSON_EXTENSION):
+            save_json(temporary, start, movements)
+        else:
+            save_binary(temporary, start, movements)
+        os.replace(temporary, path)
+        return path
+
+    def load(self, name: str) -> tuple:
+        # the store is a copy, so the mapping is not kept open
+        routine = self[name]
+        try:
+            return routine.load()
+        finally:
+            routine.close()
@@ -0,0 +1,108 @@
+import mmap
+import os
+
+import numpy as np
+
+from trajectory import INCHES_PER_METER
+
+# bytes parsed at a time
+CHUNK = 1 << 22
+NAMES = (('time', 't', 'timestamp', 'seconds'), ('x',), ('y',), ('heading', 'theta', 'h', 'yaw'))
+
+
+def header_columns(line: str) -> tuple:
+    names = [name.strip().lower() for name in line.split(',')]
+    try:
+        [float(name) for name in names]
+        return len(names), None
+    except ValueError:
+        pass
+    columns = []
+    for accepted in NAMES:
+        found = [index for index, name in enumerate(names) if name in accepted]
+        if not found:
+            raise ValueError(f"no {accepted[0]} column, the header is {line.strip()}")
+        columns.append(found[0])
+    return len(names), columns
+
+
+def separators(block: bytes) -> np.ndarray:
+    codes = np.frombuffer(block, dtype=np.uint8)
+    ends = np.append(np.flatnonzero(codes == ord('\n')), len(codes))
+    return np.diff(np.searchsorted(np.flatnonzero(codes == ord(',')), ends), prepend=0)
+
+
+def load_log(path: str, chunk: int = CHUNK) -> tuple:
+    if os.path.getsize(path) == 0:
+        raise ValueError(f"{path} is empty")
+    parts = []
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        end = data.find(b'\n')
+        end = len(data) if end < 0 else end
+        width, columns = header_columns(data[:end].decode())
+        start, line = end + 1, 2
+        if columns is None:
+            columns, start, line = [0, 1, 2, 3], 0, 1
+            if width < 4:
+                raise ValueError(f"{path} needs time, x, y and heading columns")
+        while start < len(data):
+            stop = data.find(b'\n', min(start + chunk, len(data)))
+            stop = len(data) if stop < 0 else stop
+            block = data[start:stop].rstrip()
+            start = stop + 1
+            if not block:
+                continue
+            ragged = np.flatnonzero(separators(block) != width - 1)
+            if len(ragged):
+                raise ValueError(f"{path} line {line + ragged[0]} does not have {width} values")
+            line += block.count(b'\n') + 1
+            values = np.fromstring(block.decode().replace('\n', ','), sep=',')
+            if len(values) % width:
+                raise ValueError(f"{path} has rows without {width} values")
+            parts.append(values.reshape(-1, width)[:, columns])
+    if not parts:
+        raise ValueError(f"{path} has no samples")
+    rows = np.concatenate(parts)
+    rows[:, 1:3] /= INCHES_PER_METER
+    return rows[:, 0], rows[:, 1:]
+
+
+def decimate(poses: np.ndarray, pixel_per_meter: float) -> np.ndarray:
+    keep = np.ones(len(poses), dtype=bool)
+    if len(poses) > 2:
+        pixels = np.floor(poses[:, :2] * pixel_per_meter).astype(np.int64)
+        keep[1:-1] = np.any(pixels[1:-1] != pixels[:-2], axis=1)
+    return np.flatnonzero(keep)
+
+
+def deviation(points: np.ndarray, movement: np.ndarray, planned: np.ndarray, count: int, block: int = 256) -> tuple:
+    # points are matched a block at a time, so the distance matrix stays small
+    joined = movement[:-1] == movement[1:]
+    starts, ends, owners = planned[:-1][joined], planned[1:][joined], movement[:-1][joined]
+    if len(owners) == 0:
+        starts, ends, owners = planned, planned, movement
+    step_x, step_y = ends[:, 0] - starts[:, 0], ends[:, 1] - starts[:, 1]
+    length = step_x * step_x + step_y * step_y
+    inverse = np.divide(1.0, length, out=np.zeros(len(length)), where=length > 0)
+
+    nearest = np.empty(len(points), dtype=np.intp)
+    distance = np.empty(len(points))
+    for first in range(0, len(points), block):
+        offset_x = points[first:first + block, 0, None] - starts[:, 0]
+        offset_y = points[first:first + block, 1, None] - starts[:, 1]
+        along = np.clip((offset_x * step_x + offset_y * step_y) * inverse, 0, 1)
+        offset_x -= along * step_x
+        offset_y -= along * step_y
+        squared = offset_x * offset_x + offset_y * offset_y
+        best = squared.argmin(axis=1)
+        nearest[first:first + block] = best
+        distance[first:first + block] = squared[np.arange(len(best)), best]
+    distance = np.sqrt(distance)
+    owner = owners[nearest]
+
+    matched = np.bincount(owner, minlength=count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(matched > 0, np.bincount(owner, distance, minlength=count) / matched, np.nan)
+    worst = np.full(count, -np.inf)
+    np.maximum.at(worst, owner, distance)
+    return mean, np.where(matched > 0, worst, np.nan)
@@ -0,0 +1,90 @@
+import abc
+import math
+
+from compaction import compact
+from trajectory import INCHES_PER_METER, ActionType, Direction, Movement, advance
+
+
+class Template(abc.ABC):
+    name = None
+    extension = '.txt'
+    # bump when the generated text changes, so cached exports are written again
+    version = 1
+
+    @abc.abstractmethod
+    def render(self, start: tuple, movements) -> str:
+        pass
+
+
+class RoadRunner(Template):
+    name = 'roadrunner'
+    extension = '.java'
+
+    def render(self, start: tuple, movements) -> str:
+        x, y, heading = start
+        header = f"""SampleMecanumDrive drive = new SampleMecanumDrive(hardwareMap);
+drive.setPoseEstimate(new Pose2d({x * INCHES_PER_METER}, {y * INCHES_PER_METER}, {heading}));
+TrajectorySequence trajectory = drive.trajectorySequenceBuilder(drive.getPoseEstimate())
+    """
+        code = [movement.to_code() for movement in movements if movement.action != ActionType.VOID]
+
+        code.append(
+            ".build();"
+        )
+
+        return header + "\n\t".join(code) + "\ndrive.followTrajectorySequence(trajectory);"
+
+
+class RoadRunnerActions(Template):
+    # Road Runner 1.0 has no relative moves, so every move becomes a strafe to where it ends
+    name = 'roadrunner-actions'
+    extension = '.java'
+
+    @staticmethod
+    def vector(x: float, y: float) -> str:
+        return f"new Vector2d({round(x * INCHES_PER_METER, 4)}, {round(y * INCHES_PER_METER, 4)})"
+
+    def line(self, movement: Movement) -> str:
+        if movement.action == ActionType.MOVEMENT:
+            x, y, heading = advance(movement.state, movement.action, movement.direction, movement.amount)
+            if movement.direction == Direction.POSITIONAL and len(movement.amount) == 3:
+                return f".strafeToLinearHeading({self.vector(x, y)}, {heading})"
+            return f".strafeTo({self.vector(x, y)})"
+        elif movement.action == ActionType.SPLINE:
+            x, y, tangent = movement.amount
+            return f".splineTo({self.vector(x, y)}, {tangent})"
+        elif movement.action == ActionType.ROTATION:
+            return f".turn({-movement.amount})"
+        elif movement.action == ActionType.SLEEP:
+            return f".waitSeconds({movement.amount})"
+        elif movement.action == ActionType.FUNCTION:
+            return f".stopAndAdd(new InstantAction(() -> {movement.amount}({movement.arguments})))"
+
+    def render(self, start: tuple, movements) -> str:
+        x, y, heading = start
+        header = f"""MecanumDrive drive = new MecanumDrive(hardwareMap, new Pose2d({x * INCHES_PER_METER}, {y * INCHES_PER_METER}, {heading}));
+Action trajectory = drive.actionBuilder(drive.pose)
+    """
+        code = [self.line(movement) for movement in movements if movement.action != ActionType.VOID]
+        code.append(".build();")
+        return header + "\n\t".join(code) + "\nActions.runBlocking(trajectory);"
+
+
+class Text(Template):
+    name = 'text'
+
+    def render(self, start: tuple, movements) -> str:
+        x, y, heading = start
+        lines = [f"start {round(x * INCHES_PER_METER, 4)}, {round(y * INCHES_PER_METER, 4)}, heading {heading}"]
+        lines += [str(movement) for movement in movements if movement.action != ActionType.VOID]
+        return "\n".join(lines)
+
+
+TEMPLATES = {template.name: template for template in (RoadRunner(), RoadRunnerActions(), Text())}
+
+
+def generate_code(start: tuple, movements, template: str = 'roadrunner', tolerance: float = 0,
+                  angle: float = 0) -> str:
+    # tolerance in inches and angle in degrees, like config.json
+    movements = compact(movements, start, tolerance / INCHES_PER_METER, math.radians(angle))
+    return TEMPLATES[template].render(start, movements)
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from simulation import Recorder, Simulation, replay
+from storage import Library
+from trajectory import ActionType, Direction, Trajectory
+
+
+def drive(simulation: Simulation, name: str, steps: int, shift: bool = False):
+    simulation.press(name, shift)
+    for _ in range(steps):
+        simulation.update(simulation.timestep)
+    simulation.release(name, shift)
+
+
+def routine(trajectory: Trajectory) -> tuple:
+    store = trajectory.movements
+    return [str(movement) for movement in store], list(store.poses) + list(trajectory.pose)
+
+
+def test_replay_reproduces_a_recorded_session(tmp_path):
+    library = Library(str(tmp_path / 'routines'))
+    saved = Trajectory()
+    saved.begin()
+    saved.move(Direction.VERTICAL, 0.5)
+    library.save('auto', saved.start, saved.movements)
+
+    path = str(tmp_path / 'session.jsonl')
+    simulation = Simulation(Trajectory(), 1, 45, 120, Recorder(path))
+    drive(simulation, 'ENTER', 0)
+    drive(simulation, 'W', 30)
+    drive(simulation, 'E', 20)
+    drive(simulation, 'D', 15, shift=True)
+    drive(simulation, 'SPACE', 0)
+    simulation.line_to(0.5, 0.25, 1.0)
+    simulation.spline_to(1.0, 1.0, 0.5)
+    simulation.edit_spline(-1, 0.9, 1.1, 0.25)
+    simulation.function('intake', '1')
+    simulation.insert(1, ActionType.SLEEP, Direction.VOID, 0.5)
+    simulation.modify(0, ActionType.MOVEMENT, Direction.VERTICAL, 0.1)
+    simulation.reorder(2, 0)
+    simulation.delete(3)
+    drive(simulation, 'Z', 0)
+    simulation.select(1, 2, 90, (0.5, 0.5, 0))
+    simulation.load('auto', *library.load('auto'))
+    drive(simulation, 'S', 10)
+    simulation.close()
+
+    replayed = replay(path, library)
+    assert replayed.tick == simulation.tick
+    assert sorted(replayed.trajectories) == [0, 1]
+    for index, trajectory in simulation.trajectories.items():
+        rows, poses = routine(trajectory)
+        replayed_rows, replayed_poses = routine(replayed.trajectories[index])
+        assert replayed_rows == rows
+        assert replayed_poses == pytest.approx(poses)
+
+
+def test_replay_needs_a_header(tmp_path):
+    path = tmp_path / 'session.jsonl'
+    path.write_text(json.dumps(dict(tick=0, event='press', key='W', shift=False, accel=False)) + '\n')
+    with pytest.raises(ValueError):
+        replay(str(path))
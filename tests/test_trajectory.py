@@ -0,0 +1,151 @@
+import math
+
+import pytest
+
+from trajectory import INCHES_PER_METER, ActionType, Direction, Trajectory, parse
+
+
+def inches(value: float) -> float:
+    return value / INCHES_PER_METER
+
+
+def routine(*lines: str) -> Trajectory:
+    trajectory = Trajectory()
+    trajectory.begin()
+    for line in lines:
+        action, direction, amount, arguments = parse(line)
+        trajectory.insert(len(trajectory.movements), action, direction, amount, arguments)
+    return trajectory
+
+
+def rows(trajectory: Trajectory) -> list:
+    return [str(movement) for movement in trajectory.movements]
+
+
+def starts(trajectory: Trajectory) -> list:
+    return [trajectory.movements.pose(index) for index in range(len(trajectory.movements))]
+
+
+def assert_same(trajectory: Trajectory, expected: Trajectory):
+    assert rows(trajectory) == rows(expected)
+    assert starts(trajectory) == pytest.approx(starts(expected))
+    assert trajectory.pose == pytest.approx(expected.pose)
+
+
+def test_apply_before_begin_only_moves_the_robot():
+    trajectory = Trajectory()
+    trajectory.move(Direction.VERTICAL, inches(12))
+    assert len(trajectory.movements) == 0
+    assert trajectory.pose == pytest.approx((inches(12), 0, 0), abs=1e-4)
+
+
+def test_held_key_merges_into_one_movement():
+    trajectory = Trajectory()
+    trajectory.begin()
+    for _ in range(3):
+        trajectory.move(Direction.VERTICAL, inches(4))
+    assert rows(trajectory) == ['move forwards 12.0']
+
+
+def test_opposite_moves_cancel_the_movement():
+    trajectory = Trajectory()
+    trajectory.begin()
+    trajectory.move(Direction.VERTICAL, inches(4))
+    trajectory.move(Direction.VERTICAL, inches(-4))
+    assert len(trajectory.movements) == 0
+    assert trajectory.pose == pytest.approx((0, 0, 0))
+
+
+def test_separator_and_functions_do_not_merge():
+    trajectory = Trajectory()
+    trajectory.begin()
+    trajectory.move(Direction.VERTICAL, inches(4))
+    trajectory.separate()
+    trajectory.move(Direction.VERTICAL, inches(4))
+    trajectory.function('intake')
+    trajectory.function('intake')
+    assert [movement.action for movement in trajectory.movements] == [
+        ActionType.MOVEMENT, ActionType.VOID, ActionType.MOVEMENT, ActionType.FUNCTION, ActionType.FUNCTION
+    ]
+
+
+def test_undo_and_redo_a_held_key_as_one_step():
+    trajectory = Trajectory()
+    trajectory.begin()
+    trajectory.move(Direction.VERTICAL, inches(12))
+    trajectory.checkpoint()
+    for _ in range(3):
+        trajectory.turn(math.radians(30))
+    trajectory.checkpoint()
+    pose = trajectory.pose
+
+    assert trajectory.undo()
+    assert rows(trajectory) == ['move forwards 12.0']
+    assert trajectory.pose == pytest.approx((inches(12), 0, 0), abs=1e-4)
+    assert trajectory.redo()
+    assert len(trajectory.movements) == 2
+    assert trajectory.pose == pytest.approx(pose)
+    assert trajectory.undo() and trajectory.undo()
+    assert not trajectory.undo()
+    assert len(trajectory.movements) == 0
+
+
+def test_insert_moves_the_rest_of_the_routine():
+    trajectory = routine('move forwards 12', 'move right 6')
+    action, direction, amount, _ = parse('turn left 90')
+    trajectory.insert(1, action, direction, amount)
+    assert_same(trajectory, routine('move forwards 12', 'turn left 90', 'move right 6'))
+
+
+def test_delete_modify_and_reorder_match_building_in_that_order():
+    trajectory = routine('move forwards 12', 'turn left 90', 'move right 6', 'wait 1.0')
+    trajectory.delete(1)
+    assert_same(trajectory, routine('move forwards 12', 'move right 6', 'wait 1.0'))
+
+    action, direction, amount, _ = parse('move backwards 3')
+    trajectory.modify(0, action, direction, amount)
+    assert_same(trajectory, routine('move backwards 3', 'move right 6', 'wait 1.0'))
+
+    trajectory.reorder(2, 0)
+    assert_same(trajectory, routine('wait 1.0', 'move backwards 3', 'move right 6'))
+
+
+def test_edits_are_undone_one_at_a_time():
+    trajectory = routine('move forwards 12', 'turn left 90', 'move right 6')
+    original = rows(trajectory), starts(trajectory)
+    trajectory.delete(0)
+    action, direction, amount, _ = parse('move backwards 3')
+    trajectory.modify(0, action, direction, amount)
+    trajectory.reorder(1, 0)
+    edited = rows(trajectory), starts(trajectory)
+
+    for _ in range(3):
+        assert trajectory.undo()
+    assert (rows(trajectory), starts(trajectory)) == original
+    for _ in range(3):
+        assert trajectory.redo()
+    assert (rows(trajectory), starts(trajectory)) == edited
+
+
+def test_line_to_with_heading_anchors_the_rest():
+    trajectory = routine('move forwards 12', 'line to 24, 24, heading 90', 'move forwards 6')
+    anchored = starts(trajectory)[2]
+    action, direction, amount, _ = parse('move right 10')
+    trajectory.insert(1, action, direction, amount)
+    assert starts(trajectory)[3] == anchored
+
+
+def test_edit_spline_only_edits_splines():
+    trajectory = routine('move forwards 12', 'spline to 24, 24, tangent 45')
+    trajectory.edit_spline(1, 0.5, 0.5, math.radians(45))
+    assert rows(trajectory)[1] == 'spline to 19.685, 19.685, tangent 45.0'
+    with pytest.raises(ValueError):
+        trajectory.edit_spline(0, 0, 0, 0)
+
+
+@pytest.mark.parametrize('line', [
+    'move forwards 12.0', 'move left 3.5', 'wait 0.5', 'execute intake (1)',
+    'line to 24.0, -12.0', 'line to 24.0, -12.0, heading 90.0', 'spline to 12.0, 12.0, tangent 45.0'
+])
+def test_console_text_reads_back(line):
+    assert rows(routine(line)) == [line]
@@ -0,0 +1,643 @@
+import math
+import re
+from array import array
+from collections import deque
+from enum import Enum
+
+import numpy as np
+
+INCHES_PER_METER = 39.37
+
+
+class ActionType(Enum):
+    VOID = -1
+    ROTATION = 0
+    MOVEMENT = 1
+    SLEEP = 2
+    FUNCTION = 3
+    SPLINE = 4
+
+
+class Direction(Enum):
+    VOID = -1
+    HORIZONTAL = 0
+    VERTICAL = 1
+    POSITIONAL = 10
+
+
+class Change(Enum):
+    APPEND = 0
+    REPLACE = 1
+    REMOVE = 2
+    CLEAR = 3
+    UPDATE = 4
+    INSERT = 5
+    DELETE = 6
+
+
+# enum members by the values the store keeps, looking them up is cheaper than calling the enum
+ACTIONS = {action.value: action for action in ActionType}
+DIRECTIONS = {direction.value: direction for direction in Direction}
+
+
+class Movement:
+    __slots__ = ('action', 'direction', 'amount', 'arguments', 'state')
+
+    def __init__(self, action: ActionType, direction: Direction, amount: any, state: tuple, arguments=''):
+        self.action = action
+        self.direction = direction
+        self.amount = amount
+        self.arguments = arguments
+
+        try:
+            self.amount = round(amount, 4)
+        except TypeError:
+            pass
+
+        self.state = state
+
+    def __repr__(self):
+        if self.action == ActionType.MOVEMENT:
+            if self.direction == Direction.VERTICAL:
+                if self.amount > 0:
+                    return f"move forwards {round(abs(self.amount * INCHES_PER_METER), 4)}"
+                elif self.amount < 0:
+                    return f"move backwards {round(abs(self.amount * INCHES_PER_METER), 4)}"
+            elif self.direction == Direction.HORIZONTAL:
+                if self.amount > 0:
+                    return f"move right {round(abs(self.amount * INCHES_PER_METER), 4)}"
+                elif self.amount < 0:
+                    return f"move left {round(abs(self.amount * INCHES_PER_METER), 4)}"
+            elif self.direction == Direction.POSITIONAL:
+                x, y = round(self.amount[0] * INCHES_PER_METER, 4), round(self.amount[1] * INCHES_PER_METER, 4)
+                if len(self.amount) == 2:
+                    return f"line to {x}, {y}"
+                elif len(self.amount) == 3:
+                    return f"line to {x}, {y}, heading {round(math.degrees(self.amount[2]), 4)}"
+
+        elif self.action == ActionType.SPLINE:
+            x, y = round(self.amount[0] * INCHES_PER_METER, 4), round(self.amount[1] * INCHES_PER_METER, 4)
+            return f"spline to {x}, {y}, tangent {round(math.degrees(self.amount[2]), 4)}"
+
+        elif self.action == ActionType.ROTATION:
+            if self.amount > 0:
+                return f"turn right {round(math.degrees(abs(self.amount)), 4)}"
+            elif self.amount < 0:
+                return f"turn left {round(math.degrees(abs(self.amount)), 4)}"
+
+        elif self.action == ActionType.SLEEP:
+            return f"wait {abs(self.amount)}"
+
+        elif self.action == ActionType.FUNCTION:
+            return f"execute {self.amount} ({self.arguments})"
+
+        return "[Error]: " + str(self.amount)
+
+    def to_code(self):
+        if self.action == ActionType.MOVEMENT:
+            if self.direction == Direction.VERTICAL:
+                if self.amount > 0:
+                    return f".forward({round(self.amount * INCHES_PER_METER, 4)})"
+                elif self.amount < 0:
+                    return f".back({round(abs(self.amount) * INCHES_PER_METER, 4)})"
+            elif self.direction == Direction.HORIZONTAL:
+                if self.amount > 0:
+                    return f".strafeRight({round(self.amount * INCHES_PER_METER, 4)})"
+                elif self.amount < 0:
+                    return f".strafeLeft({round(abs(self.amount) * INCHES_PER_METER, 4)})"
+            elif self.direction == Direction.POSITIONAL:
+                x, y = round(self.amount[0] * INCHES_PER_METER, 4), round(self.amount[1] * INCHES_PER_METER, 4)
+                if len(self.amount) == 2:
+                    return f".lineTo(new Vector2d({x}, {y}))"
+                elif len(self.amount) == 3:
+                    return f".lineToLinearHeading(new Pose2d({x}, {y}, {self.amount[2]}))"
+
+        elif self.action == ActionType.SPLINE:
+            x, y = round(self.amount[0] * INCHES_PER_METER, 4), round(self.amount[1] * INCHES_PER_METER, 4)
+            return f".splineTo(new Vector2d({x}, {y}), {self.amount[2]})"
+        elif self.action == ActionType.ROTATION:
+            return f".turn({-self.amount})"
+        elif self.action == ActionType.SLEEP:
+            return f".waitSeconds({self.amount})"
+        elif self.action == ActionType.FUNCTION:
+            return f".addDisplacementMarker(() -> {self.amount}({self.arguments}))"
+
+    def __add__(self, other):
+        return Movement(self.action, self.direction, self.amount + other.amount, self.state)
+
+
+def advance(pose: tuple, action: ActionType, direction: Direction, amount: any) -> tuple:
+    x, y, heading = pose
+    if action == ActionType.MOVEMENT:
+        if direction == Direction.VERTICAL:
+            x += amount * math.cos(heading)
+            y += amount * math.sin(heading)
+        elif direction == Direction.HORIZONTAL:
+            x += amount * math.sin(heading)
+            y -= amount * math.cos(heading)
+        elif direction == Direction.POSITIONAL:
+            x, y = amount[0], amount[1]
+            if len(amount) == 3:
+                heading = amount[2]
+    elif action == ActionType.SPLINE:
+        x, y, heading = amount
+    elif action == ActionType.ROTATION:
+        heading -= amount
+    return x, y, heading
+
+
+NUMBER = r"(-?\d+(?:\.\d+)?)"
+SIGNS = {'forwards': 1, 'backwards': -1, 'right': 1, 'left': -1}
+GRAMMAR = (
+    (re.compile(rf"move (forwards|backwards) {NUMBER}"), ActionType.MOVEMENT, Direction.VERTICAL),
+    (re.compile(rf"move (right|left) {NUMBER}"), ActionType.MOVEMENT, Direction.HORIZONTAL),
+    (re.compile(rf"turn (right|left) {NUMBER}"), ActionType.ROTATION, Direction.VOID),
+    (re.compile(rf"wait {NUMBER}"), ActionType.SLEEP, Direction.VOID),
+    (re.compile(rf"line to {NUMBER}, ?{NUMBER}(?:, ?heading {NUMBER})?"), ActionType.MOVEMENT, Direction.POSITIONAL),
+    (re.compile(rf"spline to {NUMBER}, ?{NUMBER}, ?tangent {NUMBER}"), ActionType.SPLINE, Direction.POSITIONAL),
+    (re.compile(r"execute (\w+) ?(?:\((.*)\))?"), ActionType.FUNCTION, Direction.VOID),
+)
+
+
+def parse(text: str) -> tuple:
+    text = " ".join(text.split())
+    for pattern, action, direction in GRAMMAR:
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        groups = match.groups()
+        if action == ActionType.FUNCTION:
+            return action, direction, groups[0], groups[1] or ''
+        if action == ActionType.SLEEP:
+            return action, direction, float(groups[0]), ''
+        if direction == Direction.POSITIONAL:
+            x, y = float(groups[0]) / INCHES_PER_METER, float(groups[1]) / INCHES_PER_METER
+            amount = (x, y) if groups[2] is None else (x, y, math.radians(float(groups[2])))
+            return action, direction, amount, ''
+        amount = SIGNS[groups[0]] * float(groups[1])
+        if action == ActionType.ROTATION:
+            return action, direction, math.radians(amount), ''
+        return action, direction, amount / INCHES_PER_METER, ''
+    raise ValueError(f"cannot read movement: {text}")
+
+
+class MovementStore:
+    __slots__ = ('actions', 'directions', 'amounts', 'poses', 'labels', '_listed')
+
+    # one row per movement: enum values, three amount slots and the start pose
+    def __init__(self):
+        self.actions = array('b')
+        self.directions = array('b')
+        self.amounts = array('d')
+        self.poses = array('d')
+        self.labels = []
+        self._listed = None
+
+    def __len__(self):
+        return len(self.actions)
+
+    def __getitem__(self, index: int) -> Movement:
+        index = range(len(self))[index]
+        action = ActionType(self.actions[index])
+        label = self.labels[index]
+        return Movement(
+            action,
+            Direction(self.directions[index]),
+            label[0] if action == ActionType.FUNCTION else self.amount(index),
+            self.pose(index),
+            label[1] if action == ActionType.FUNCTION else ''
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def action(self, index: int) -> ActionType:
+        return ActionType(self.actions[index])
+
+    def direction(self, index: int) -> Direction:
+        return Direction(self.directions[index])
+
+    def amount(self, index: int) -> any:
+        index = range(len(self))[index]
+        if self.directions[index] == Direction.POSITIONAL.value:
+            x, y, heading = self.amounts[index * 3:index * 3 + 3]
+            return (x, y) if math.isnan(heading) else (x, y, heading)
+        return self.amounts[index * 3]
+
+    def pose(self, index: int) -> tuple:
+        index = range(len(self))[index]
+        return tuple(self.poses[index * 3:index * 3 + 3])
+
+    def listed(self) -> np.ndarray:
+        # console rows skip separators
+        if self._listed is None:
+            self._listed = np.flatnonzero(np.frombuffer(self.actions, dtype=np.int8) != ActionType.VOID.value)
+        return self._listed
+
+    def row(self, index: int) -> int:
+        return int(np.searchsorted(self.listed(), index))
+
+    @staticmethod
+    def encode(action: ActionType, direction: Direction, amount: any, arguments='') -> tuple:
+        if direction == Direction.POSITIONAL:
+            return (amount[0], amount[1], amount[2] if len(amount) == 3 else math.nan), None
+        elif action == ActionType.FUNCTION:
+            return (0, 0, 0), (amount, arguments)
+        return (amount, 0, 0), None
+
+    def append(self, action: ActionType, direction: Direction, amount: any, pose: tuple, arguments=''):
+        self._listed = None
+        amounts, label = self.encode(action, direction, amount, arguments)
+        self.actions.append(action.value)
+        self.directions.append(direction.value)
+        self.amounts.extend(amounts)
+        self.labels.append(label)
+        self.poses.extend(pose)
+
+    def insert(self, index: int, action: ActionType, direction: Direction, amount: any, pose: tuple, arguments=''):
+        self._listed = None
+        amounts, label = self.encode(action, direction, amount, arguments)
+        self.actions.insert(index, action.value)
+        self.directions.insert(index, direction.value)
+        self.amounts[index * 3:index * 3] = array('d', amounts)
+        self.labels.insert(index, label)
+        self.poses[index * 3:index * 3] = array('d', pose)
+
+    def set(self, index: int, action: ActionType, direction: Direction, amount: any, arguments=''):
+        self._listed = None
+        index = range(len(self))[index]
+        amounts, label = self.encode(action, direction, amount, arguments)
+        self.actions[index] = action.value
+        self.directions[index] = direction.value
+        self.amounts[index * 3:index * 3 + 3] = array('d', amounts)
+        self.labels[index] = label
+
+    def set_amount(self, index: int, amount: float):
+        self.amounts[range(len(self))[index] * 3] = amount
+
+    def set_pose(self, index: int, pose: tuple):
+        index = range(len(self))[index]
+        self.poses[index * 3:index * 3 + 3] = array('d', pose)
+
+    def delete(self, index: int) -> Movement:
+        self._listed = None
+        index = range(len(self))[index]
+        movement = self[index]
+        del self.actions[index]
+        del self.directions[index]
+        del self.amounts[index * 3:index * 3 + 3]
+        del self.poses[index * 3:index * 3 + 3]
+        del self.labels[index]
+        return movement
+
+    def pop(self) -> Movement:
+        self._listed = None
+        movement = self[-1]
+        self.actions.pop()
+        self.directions.pop()
+        del self.amounts[-3:]
+        del self.poses[-3:]
+        self.labels.pop()
+        return movement
+
+    def clear(self):
+        self._listed = None
+        del self.actions[:]
+        del self.directions[:]
+        del self.amounts[:]
+        del self.poses[:]
+        self.labels.clear()
+
+
+class Edit(Enum):
+    APPEND = 0
+    REMOVE = 1
+    AMOUNT = 2
+    STATE = 3
+    MODIFY = 4
+    INSERT = 5
+    DELETE = 6
+
+
+class History:
+    def __init__(self, depth: int = 1000):
+        self.undo_stack = deque(maxlen=depth)
+        self.redo_stack = deque(maxlen=depth)
+        self.grouping = False
+
+    # edits are deltas against the tail of the store, whole states are only kept by reference
+    def record(self, edit: Edit, *data):
+        self.redo_stack.clear()
+        if not self.grouping or not self.undo_stack:
+            self.undo_stack.append([])
+            self.grouping = True
+        group = self.undo_stack[-1]
+        if edit == Edit.AMOUNT and group and group[-1][0] == Edit.AMOUNT:
+            group[-1] = (Edit.AMOUNT, group[-1][1], data[1])
+        elif edit == Edit.MODIFY and group and group[-1][0] == Edit.MODIFY and group[-1][1] == data[0]:
+            group[-1] = (Edit.MODIFY, data[0], group[-1][2], data[2])
+        else:
+            group.append((edit, *data))
+
+    def checkpoint(self):
+        self.grouping = False
+
+    def undo(self) -> list:
+        self.grouping = False
+        if not self.undo_stack:
+            return None
+        group = self.undo_stack.pop()
+        self.redo_stack.append(group)
+        return group
+
+    def redo(self) -> list:
+        self.grouping = False
+        if not self.redo_stack:
+            return None
+        group = self.redo_stack.pop()
+        self.undo_stack.append(group)
+        return group
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.grouping = False
+
+
+class Trajectory:
+    def __init__(self, start: tuple = (0.0, 0.0, 0.0), history_depth: int = 1000):
+        self.origin = start
+        self.start = start
+        self.pose = start
+        self.setup = False
+        self.movements = MovementStore()
+        self.history = History(history_depth)
+        self.listeners = []
+
+    def notify(self, change: Change, movement: Movement = None, rows: range = None):
+        # rows: the edited row, then every row that moved
+        for listener in self.listeners:
+            listener(change, movement, rows)
+
+    def begin(self):
+        self.start = self.pose
+        self.setup = True
+
+    def checkpoint(self):
+        self.history.checkpoint()
+
+    def end_pose(self) -> tuple:
+        if len(self.movements) == 0:
+            return self.start
+        last = self.movements[-1]
+        return advance(last.state, last.action, last.direction, last.amount)
+
+    def apply(self, action: ActionType, direction: Direction, amount: any, arguments='') -> tuple:
+        if not self.setup:
+            self.pose = advance(self.pose, action, direction, amount)
+            return self.pose
+
+        store = self.movements
+        mergeable = direction != Direction.POSITIONAL and action != ActionType.FUNCTION
+        if mergeable and len(store) > 0 and store.actions[-1] == action.value and store.directions[-1] == direction.value:
+            start = store.pose(-1)
+            previous = store.amount(-1)
+            total = round(previous + amount, 4)
+            if total != 0:
+                store.set_amount(-1, total)
+                self.history.record(Edit.AMOUNT, previous, total)
+                self.pose = advance(start, action, direction, total)
+                self.notify(Change.REPLACE, store[-1])
+            else:
+                movement = store.pop()
+                self.history.record(Edit.REMOVE, movement)
+                self.pose = start
+                self.notify(Change.REMOVE, movement)
+        else:
+            movement = Movement(action, direction, amount, self.pose, arguments)
+            if action == ActionType.FUNCTION or movement.amount != 0:
+                self.append(movement)
+                self.pose = advance(self.pose, action, direction, movement.amount)
+        return self.pose
+
+    def append(self, movement: Movement):
+        self.movements.append(movement.action, movement.direction, movement.amount, movement.state, movement.arguments)
+        self.history.record(Edit.APPEND, movement)
+        self.notify(Change.APPEND, movement)
+
+    def move(self, direction: Direction, amount: float) -> tuple:
+        return self.apply(ActionType.MOVEMENT, direction, amount)
+
+    def turn(self, amount: float) -> tuple:
+        return self.apply(ActionType.ROTATION, Direction.VOID, amount)
+
+    def line_to(self, x: float, y: float, heading: float = None) -> tuple:
+        target = (x, y) if heading is None else (x, y, heading)
+        self.checkpoint()
+        self.apply(ActionType.MOVEMENT, Direction.POSITIONAL, target)
+        self.checkpoint()
+        return self.pose
+
+    def spline_to(self, x: float, y: float, tangent: float) -> tuple:
+        self.checkpoint()
+        self.apply(ActionType.SPLINE, Direction.POSITIONAL, (x, y, tangent))
+        self.checkpoint()
+        return self.pose
+
+    def start_of(self, index: int) -> tuple:
+        return self.movements.pose(index) if index < len(self.movements) else self.end_pose()
+
+    def settle(self, first: int) -> int:
+        # poses are recomputed only until a row already starts where it should
+        store = self.movements
+        pose = self.start if first == 0 else advance(
+            store.pose(first - 1), store.action(first - 1), store.direction(first - 1), store.amount(first - 1)
+        )
+        actions, directions, amounts, poses = store.actions, store.directions, store.amounts, store.poses
+        positional = Direction.POSITIONAL.value
+        for row in range(first, len(actions)):
+            offset = row * 3
+            if (poses[offset], poses[offset + 1], poses[offset + 2]) == pose:
+                return row
+            poses[offset], poses[offset + 1], poses[offset + 2] = pose
+            if directions[row] == positional:
+                x, y, heading = amounts[offset:offset + 3]
+                amount = (x, y) if math.isnan(heading) else (x, y, heading)
+            else:
+                amount = amounts[offset]
+            pose = advance(pose, ACTIONS[actions[row]], DIRECTIONS[directions[row]], amount)
+        if self.setup:
+            self.pose = pose
+        return len(actions)
+
+    def place(self, index: int, movement: Movement):
+        self.movements.insert(index, movement.action, movement.direction, movement.amount, movement.state,
+                              movement.arguments)
+        self.settle(index + 1)
+        self.notify(Change.INSERT, movement, range(index, len(self.movements)))
+
+    def take(self, index: int) -> Movement:
+        movement = self.movements.delete(index)
+        self.settle(index)
+        self.notify(Change.DELETE, movement, range(index, len(self.movements)))
+        return movement
+
+    def rewrite(self, index: int, movement: Movement):
+        self.movements.set(index, movement.action, movement.direction, movement.amount, movement.arguments)
+        self.notify(Change.UPDATE, self.movements[index], range(index, self.settle(index + 1)))
+
+    def insert(self, index: int, action: ActionType, direction: Direction, amount: any, arguments='') -> tuple:
+        index = min(max(index, 0), len(self.movements))
+        movement = Movement(action, direction, amount, self.start_of(index), arguments)
+        self.checkpoint()
+        self.history.record(Edit.INSERT, index, movement)
+        self.checkpoint()
+        self.place(index, movement)
+        return self.pose
+
+    def delete(self, index: int) -> tuple:
+        index = range(len(self.movements))[index]
+        self.checkpoint()
+        self.history.record(Edit.DELETE, index, self.movements[index])
+        self.checkpoint()
+        self.take(index)
+        return self.pose
+
+    def modify(self, index: int, action: ActionType, direction: Direction, amount: any, arguments='') -> tuple:
+        index = range(len(self.movements))[index]
+        previous = self.movements[index]
+        movement = Movement(action, direction, amount, previous.state, arguments)
+        if (movement.action, movement.direction, movement.amount, movement.arguments) != \
+                (previous.action, previous.direction, previous.amount, previous.arguments):
+            self.history.record(Edit.MODIFY, index, previous, movement)
+            self.rewrite(index, movement)
+        return self.pose
+
+    def reorder(self, index: int, target: int) -> tuple:
+        index = range(len(self.movements))[index]
+        target = min(max(target, 0), len(self.movements) - 1)
+        if target != index:
+            self.checkpoint()
+            movement = self.movements[index]
+            self.history.record(Edit.DELETE, index, movement)
+            self.take(index)
+            movement = Movement(movement.action, movement.direction, movement.amount, self.start_of(target),
+                                movement.arguments)
+            self.history.record(Edit.INSERT, target, movement)
+            self.place(target, movement)
+            self.checkpoint()
+        return self.pose
+
+    def edit_spline(self, index: int, x: float, y: float, tangent: float) -> tuple:
+        index = range(len(self.movements))[index]
+        if self.movements.action(index) != ActionType.SPLINE:
+            raise ValueError(f"movement {index + 1} is not a spline")
+        return self.modify(index, ActionType.SPLINE, Direction.POSITIONAL, (round(x, 4), round(y, 4), tangent))
+
+    def sleep(self, seconds: float) -> tuple:
+        return self.apply(ActionType.SLEEP, Direction.VOID, seconds)
+
+    def function(self, name: str, arguments='') -> tuple:
+        self.checkpoint()
+        self.apply(ActionType.FUNCTION, Direction.VOID, name, arguments)
+        self.checkpoint()
+        return self.pose
+
+    def separate(self):
+        if self.setup:
+            self.checkpoint()
+            self.append(Movement(ActionType.VOID, Direction.VOID, 0, self.pose))
+            self.checkpoint()
+
+    def state(self) -> tuple:
+        return self.start, self.movements, self.setup, self.pose
+
+    def restore(self, state: tuple):
+        self.start, self.movements, self.setup, self.pose = state
+        self.notify(Change.CLEAR)
+        for movement in self.movements:
+            self.notify(Change.APPEND, movement)
+
+    def replace(self, state: tuple):
+        # the previous store is kept as is by the history entry instead of being copied
+        self.checkpoint()
+        self.history.record(Edit.STATE, self.state(), state)
+        self.checkpoint()
+        self.restore(state)
+
+    def revert(self, edit: tuple):
+        kind = edit[0]
+        if kind == Edit.APPEND:
+            self.notify(Change.REMOVE, self.movements.pop())
+        elif kind == Edit.REMOVE:
+            movement = edit[1]
+            self.movements.append(movement.action, movement.direction, movement.amount, movement.state, movement.arguments)
+            self.notify(Change.APPEND, movement)
+        elif kind == Edit.AMOUNT:
+            self.movements.set_amount(-1, edit[1])
+            self.notify(Change.REPLACE, self.movements[-1])
+        elif kind == Edit.STATE:
+            self.restore(edit[1])
+        elif kind == Edit.MODIFY:
+            self.rewrite(edit[1], edit[2])
+        elif kind == Edit.INSERT:
+            self.take(edit[1])
+        elif kind == Edit.DELETE:
+            self.place(edit[1], edit[2])
+
+    def reapply(self, edit: tuple):
+        kind = edit[0]
+        if kind == Edit.APPEND:
+            movement = edit[1]
+            self.movements.append(movement.action, movement.direction, movement.amount, movement.state, movement.arguments)
+            self.notify(Change.APPEND, movement)
+        elif kind == Edit.REMOVE:
+            self.notify(Change.REMOVE, self.movements.pop())
+        elif kind == Edit.AMOUNT:
+            self.movements.set_amount(-1, edit[2])
+            self.notify(Change.REPLACE, self.movements[-1])
+        elif kind == Edit.STATE:
+            self.restore(edit[2])
+        elif kind == Edit.MODIFY:
+            self.rewrite(edit[1], edit[3])
+        elif kind == Edit.INSERT:
+            self.place(edit[1], edit[2])
+        elif kind == Edit.DELETE:
+            self.take(edit[1])
+
+    def undo(self) -> bool:
+        group = self.history.undo()
+        if group is None:
+            return False
+        for edit in reversed(group):
+            self.revert(edit)
+        if self.setup:
+            self.pose = self.end_pose()
+        return True
+
+    def redo(self) -> bool:
+        group = self.history.redo()
+        if group is None:
+            return False
+        for edit in group:
+            self.reapply(edit)
+        if self.setup:
+            self.pose = self.end_pose()
+        return True
+
+    def load(self, start: tuple, movements: MovementStore):
+        pose = start
+        if len(movements) > 0:
+            last = movements[-1]
+            pose = advance(last.state, last.action, last.direction, last.amount)
+        self.replace((start, movements, True, pose))
+
+    def reset(self, start: tuple = None):
+        start = self.origin if start is None else start
+        self.replace((start, MovementStore(), False, start))
+
+    def get_code(self, movements=None, template: str = 'roadrunner') -> str:
+        # templates build on the movement classes above, so they are imported here rather than at the top
+        from templates import TEMPLATES
+        return TEMPLATES[template].render(self.start, self.movements if movements is None else movements)